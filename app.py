@@ -1,12 +1,24 @@
-from flask import Flask, request, jsonify
-import difflib, os, re, requests
+from flask import Flask, Response, request, jsonify, json, stream_with_context
+import os, re, requests, tempfile
 from googlesearcher import Google
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pytrends.request import TrendReq
-import cachetools, requests, time
-import psycopg2
+import itertools, math, requests, threading, time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from keyword_cache import KeywordCache, SingleFlight, SQLiteCacheBackend
+from keyword_corpus import KeywordCorpus
+from keyword_corpus_file import corpus_path, open_corpus_file, read_corpus_version
+from keyword_jobs import JobQueue
+from keyword_shards import ShardedScorer
+from keyword_store import KeywordStore, SORT_FIELDS
+from keyword_similarity import iter_related_rows, score_related_rows, similarity_length_bounds, trigram_candidate_threshold
+from rapidapi_client import CircuitBreaker, RapidAPIClient
+from rate_limiter import TokenBucket
+from trends_client import TrendsBatcher, TrendsClientPool
 
 """
 CREATE TABLE google_keyword_data_in (
@@ -43,33 +55,320 @@ load_dotenv()
 app = Flask(__name__)
 
 import psycopg2
+from psycopg2 import extensions as psycopg2_extensions, pool as psycopg2_pool
+
+# PostgreSQL connection pool settings (each gunicorn worker gets its own pool)
+postgres_pool_min = int(os.environ.get('POSTGRES_POOL_MIN', 1))
+postgres_pool_max = int(os.environ.get('POSTGRES_POOL_MAX', 10))
+# Seconds a request waits for a free connection before giving up
+postgres_pool_timeout = float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10))
+# Connections idle for longer than this are pinged before being handed out
+postgres_pool_healthcheck_interval = float(os.environ.get('POSTGRES_POOL_HEALTHCHECK_INTERVAL', 30))
+
+def postgres_connection_params():
+    return {
+        'host': os.environ.get('POSTGRES_HOST'),
+        'user': os.environ.get('POSTGRES_USER'),
+        'password': os.environ.get('POSTGRES_PASSWORD'),
+        'database': os.environ.get('POSTGRES_DB'),
+        'port': os.environ.get('POSTGRES_PORT'),
+    }
 
 # Establish a connection to PostgreSQL
 def connect_to_postgres():
     try:
-        connection = psycopg2.connect(
-            host=os.environ.get('POSTGRES_HOST'),
-            user=os.environ.get('POSTGRES_USER'),
-            password=os.environ.get('POSTGRES_PASSWORD'),
-            database=os.environ.get('POSTGRES_DB'),
-            port=os.environ.get('POSTGRES_PORT')
-        )
+        connection = psycopg2.connect(**postgres_connection_params())
         return connection
     except Exception as e:
         print("Error connecting to PostgreSQL:", e)
         return None
 
-# Initialize a PostgreSQL connection
-postgres_connection = connect_to_postgres()
+# The pool is created lazily and tagged with the owning PID, so a pool that was
+# inherited through a gunicorn fork is never shared with the parent process.
+postgres_pool = None
+postgres_pool_pid = None
+postgres_pool_slots = None
+postgres_pool_last_used = {}
+postgres_pool_lock = threading.Lock()
+
+def get_postgres_pool():
+    global postgres_pool, postgres_pool_pid, postgres_pool_slots, postgres_pool_last_used
+
+    with postgres_pool_lock:
+        if postgres_pool is None or postgres_pool_pid != os.getpid():
+            postgres_pool = psycopg2_pool.ThreadedConnectionPool(
+                postgres_pool_min, postgres_pool_max, **postgres_connection_params()
+            )
+            postgres_pool_pid = os.getpid()
+            postgres_pool_slots = threading.BoundedSemaphore(postgres_pool_max)
+            postgres_pool_last_used = {}
+        return postgres_pool
+
+def is_postgres_connection_healthy(connection):
+    if connection.closed:
+        return False
+
+    last_used = postgres_pool_last_used.get(id(connection), 0)
+    if time.time() - last_used < postgres_pool_healthcheck_interval:
+        return True
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.rollback()
+        return True
+    except Exception:
+        return False
+
+def acquire_postgres_connection():
+    try:
+        connection_pool = get_postgres_pool()
+    except Exception as e:
+        print("Error creating PostgreSQL pool:", e)
+        return None
+
+    # ThreadedConnectionPool raises instead of waiting when it is exhausted
+    if not postgres_pool_slots.acquire(timeout=postgres_pool_timeout):
+        print(f"Timed out after {postgres_pool_timeout} seconds waiting for a PostgreSQL connection")
+        return None
+
+    try:
+        connection = connection_pool.getconn()
+        if not is_postgres_connection_healthy(connection):
+            # Recycle the broken connection and hand out a fresh one
+            connection_pool.putconn(connection, close=True)
+            connection = connection_pool.getconn()
+        return connection
+    except Exception as e:
+        postgres_pool_slots.release()
+        print("Error connecting to PostgreSQL:", e)
+        return None
+
+def release_postgres_connection(connection):
+    broken = connection.closed != 0
+    if not broken:
+        try:
+            # Never return a connection with an open or failed transaction
+            if connection.get_transaction_status() != psycopg2_extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            broken = True
+
+    try:
+        postgres_pool.putconn(connection, close=broken)
+        if broken:
+            postgres_pool_last_used.pop(id(connection), None)
+        else:
+            postgres_pool_last_used[id(connection)] = time.time()
+    finally:
+        postgres_pool_slots.release()
+
+@contextmanager
+def postgres_cursor(name=None):
+    # Yields None when no connection could be obtained so routes can answer 500.
+    # Passing a name opens a server-side cursor that streams rows in batches.
+    connection = acquire_postgres_connection()
+    if connection is None:
+        yield None
+        return
+
+    try:
+        with connection.cursor(name=name) as cursor:
+            yield cursor
+    finally:
+        release_postgres_connection(connection)
 
 # RapidAPI configurations
 RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY')
 RAPIDAPI_HOST = 'targeted-keyword-trend.p.rapidapi.com'
 
+# Pooled keep-alive client with timeouts, retries and a circuit breaker.
+# RAPIDAPI_BASE_URL can point it at a local stub server.
+rapidapi_client = RapidAPIClient(
+    os.getenv('RAPIDAPI_BASE_URL', f'https://{RAPIDAPI_HOST}'),
+    RAPIDAPI_KEY,
+    RAPIDAPI_HOST,
+    connect_timeout=float(os.getenv('RAPIDAPI_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.getenv('RAPIDAPI_READ_TIMEOUT', 8)),
+    max_retries=int(os.getenv('RAPIDAPI_MAX_RETRIES', 2)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('RAPIDAPI_BREAKER_FAILURES', 5)),
+        reset_timeout=float(os.getenv('RAPIDAPI_BREAKER_RESET', 30))
+    )
+)
+
 # Define a list of allowed country codes
 allowed_countries = ['us', 'uk', 'ca', 'in']  # Add more as needed
+# Maximum number of candidate rows pulled from the database per lookup
 num_rows = 2000
 
+# The indexes the lookups below rely on are built by keyword_migrate.py
+# --indexes-only and keyword_ingest.py, never on the request path. Whether an
+# index exists is rechecked every few minutes, so one built later is picked up.
+index_check_interval = 300
+indexes_checked = {}  # index name -> (exists, checked_at)
+
+def index_known_missing(index_name):
+    # True while a recent check found the index missing, so callers can skip
+    # borrowing a connection just to look again
+    exists, checked_at = indexes_checked.get(index_name, (False, 0))
+    return not exists and time.time() - checked_at < index_check_interval
+
+def index_exists(cursor, index_name, built_by='keyword_migrate.py --indexes-only'):
+    exists, checked_at = indexes_checked.get(index_name, (False, 0))
+    if time.time() - checked_at < index_check_interval:
+        return exists
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (index_name,))
+    exists = cursor.fetchone()[0]
+    if not exists:
+        print(f"Index {index_name} is missing; build it with {built_by}")
+    indexes_checked[index_name] = (exists, time.time())
+    return exists
+
+def fetch_exact_match_row(sanitized_keyword, sanitized_country):
+    # Returns the row whose normalized keyword equals sanitized_keyword, or
+    # None. The query expression matches the B-tree index, so this is an
+    # index lookup rather than a scan; ties resolve the same way every time.
+    if keyword_corpus_enabled:
+        snapshot = keyword_corpus.get(sanitized_country)
+        if snapshot is not None:
+            return run_scoring(snapshot.exact_row, sanitized_keyword)
+
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    with postgres_cursor() as cursor:
+        if cursor is None:
+            return None
+        # Only logs when the index is missing; the query still answers without it
+        index_exists(cursor, f'{table_name}_keyword_lower_idx')
+        cursor.execute(
+            f'SELECT * FROM {table_name} WHERE lower(trim("Keyword")) = %s ORDER BY "Keyword" LIMIT 1',
+            (sanitized_keyword,)
+        )
+        return cursor.fetchone()
+
+def candidate_query(cursor, table_name, sanitized_keyword):
+    # Returns (query, params) selecting up to num_rows rows within the length
+    # window that can still reach similarity_threshold, best trigram matches
+    # first, so the exact match (similarity 1) is always included. The trigram
+    # prefilter can miss a few qualifying rows (see trigram_candidate_threshold);
+    # without the trigram index only a sample of the window is scored.
+    min_length, max_length = similarity_length_bounds(sanitized_keyword)
+
+    if index_exists(cursor, f'{table_name}_keyword_trgm_idx'):
+        cursor.execute("SELECT set_limit(%s)", (trigram_candidate_threshold,))
+        query = (
+            f'SELECT * FROM {table_name} '
+            'WHERE lower(trim("Keyword")) %% %s '
+            'AND length(trim("Keyword")) BETWEEN %s AND %s '
+            'ORDER BY similarity(lower(trim("Keyword")), %s) DESC '
+            'LIMIT %s'
+        )
+        return query, (sanitized_keyword, min_length, max_length, sanitized_keyword, num_rows)
+
+    # Degraded mode until keyword_migrate.py --indexes-only has run: the exact
+    # match through the B-tree index, then a fresh random sample of the length
+    # window on every call, so no row is permanently out of reach
+    query = (
+        f'(SELECT * FROM {table_name} WHERE lower(trim("Keyword")) = %s) '
+        'UNION ALL '
+        f'(SELECT * FROM {table_name} '
+        'WHERE length(trim("Keyword")) BETWEEN %s AND %s '
+        'AND lower(trim("Keyword")) <> %s '
+        'ORDER BY RANDOM() LIMIT %s)'
+    )
+    return query, (sanitized_keyword, min_length, max_length, sanitized_keyword, num_rows)
+
+def fetch_candidate_rows(cursor, table_name, sanitized_keyword):
+    cursor.execute(*candidate_query(cursor, table_name, sanitized_keyword))
+    return cursor.fetchall()
+
+# Rows fetched per round trip when streaming candidates from a server-side cursor
+stream_batch_size = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
+def stream_candidate_rows(sanitized_keyword, sanitized_country):
+    # Like fetch_candidate_rows, but reads the rows through a server-side
+    # cursor in batches of stream_batch_size. The pooled connection is held
+    # until the generator is exhausted or closed.
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    with postgres_cursor() as cursor:
+        if cursor is None:
+            raise RuntimeError("Failed to connect to the database.")
+        query, params = candidate_query(cursor, table_name, sanitized_keyword)
+        with cursor.connection.cursor(name=f'stream_{table_name}') as stream:
+            stream.itersize = stream_batch_size
+            stream.execute(query, params)
+            yield from stream
+
+def load_keyword_table(sanitized_country):
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    with postgres_cursor(name=f'load_{table_name}') as cursor:
+        if cursor is None:
+            raise RuntimeError("Failed to connect to the database.")
+        cursor.execute(f'SELECT * FROM {table_name}')
+        # Stream the rows so the compact store is built without holding the
+        # whole table as tuples
+        yield from cursor
+
+def keyword_table_version(sanitized_country):
+    # The table statistics counters move on every insert, update and delete,
+    # which is much cheaper than counting or hashing the table. The table's
+    # OID changes when keyword_ingest.py or keyword_migrate.py swap in a new
+    # table under the same name, even if its counters match the old one's.
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    with postgres_cursor() as cursor:
+        if cursor is None:
+            raise RuntimeError("Failed to connect to the database.")
+        cursor.execute(
+            "SELECT relid, n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables WHERE relname = %s",
+            (table_name,)
+        )
+        return cursor.fetchone()
+
+# In the gevent serving mode (gunicorn_async.conf.py) every request is a
+# greenlet, so CPU-bound scoring would stall every other request on the
+# worker. There it runs on gevent's pool of real threads instead; for more
+# than one core's worth of scoring per worker, set SCORING_SHARDS as well.
+scoring_offload = os.environ.get('SCORING_OFFLOAD') == 'gevent'
+
+def run_scoring(func, *args):
+    if not scoring_offload:
+        return func(*args)
+    import gevent
+    return gevent.get_hub().threadpool.apply(func, args)
+
+# Keep an in-memory copy of every country table so lookups skip the database
+keyword_corpus_enabled = os.environ.get('KEYWORD_CORPUS_ENABLED', '1') == '1'
+# SCORING_SHARDS > 1 scores each seed across that many processes, reading the
+# keywords from shared memory; worth it for corpora of millions of keywords
+scoring_shards = int(os.environ.get('SCORING_SHARDS', 1))
+# With KEYWORD_CORPUS_DIR the snapshots are mapped from the corpus files that
+# keyword_corpus_file.py builds there instead of being loaded from the
+# database, so every worker shares one copy in the page cache
+keyword_corpus_dir = os.environ.get('KEYWORD_CORPUS_DIR')
+
+def load_corpus_file(sanitized_country):
+    return open_corpus_file(corpus_path(keyword_corpus_dir, sanitized_country))
+
+def corpus_file_version(sanitized_country):
+    return read_corpus_version(corpus_path(keyword_corpus_dir, sanitized_country))
+
+keyword_corpus = KeywordCorpus(
+    load_keyword_table, corpus_file_version if keyword_corpus_dir else keyword_table_version,
+    refresh_interval=float(os.environ.get('KEYWORD_CORPUS_REFRESH_INTERVAL', 300)),
+    scorer=ShardedScorer(scoring_shards, min_window=int(os.environ.get('SCORING_SHARD_MIN_WINDOW', 20000)))
+    if scoring_shards > 1 else None,
+    load_store=load_corpus_file if keyword_corpus_dir else None
+)
+
+# With gunicorn --preload the snapshots are built once in the master and shared
+# copy-on-write by the workers; otherwise each worker loads them on first use
+if keyword_corpus_enabled and os.environ.get('KEYWORD_CORPUS_PRELOAD') == '1':
+    for preload_country in allowed_countries:
+        try:
+            keyword_corpus.load(preload_country)
+        except Exception as e:
+            print(f"Failed to preload keyword corpus for '{preload_country}': {str(e)}")
+
 # Define the initial date and update interval
 date_present = datetime(2023, 12, 20)
 update_interval = timedelta(days=10)
@@ -84,44 +383,166 @@ def update_date_cyclically(current_date, interval):
 updated_date = update_date_cyclically(date_present, update_interval)
 formatted_date = updated_date.strftime('%B %d, %Y')
 
-# Initialize a simple cache with a maximum size (adjust as needed)
-cache = cachetools.LRUCache(maxsize=100)
-
-# Define the minimum delay between requests (in seconds)
+# Cache for upstream responses, with a TTL per source (in seconds). Setting
+# CACHE_BACKEND_PATH shares the cache between all workers through a local
+# SQLite file.
+cache_ttls = {
+    'trends': int(os.environ.get('CACHE_TTL_TRENDS', 6 * 3600)),
+    'serp': int(os.environ.get('CACHE_TTL_SERP', 3600)),
+    'interest': int(os.environ.get('CACHE_TTL_INTEREST', 6 * 3600)),
+    'trend_history': int(os.environ.get('CACHE_TTL_TREND_HISTORY', 24 * 3600)),
+}
+# How long past its TTL an entry may still be served while it is refreshed in
+# the background (stale-while-revalidate)
+cache_stale_ttls = {
+    'interest': int(os.environ.get('CACHE_STALE_TTL_INTEREST', 24 * 3600)),
+    'trend_history': int(os.environ.get('CACHE_STALE_TTL_TREND_HISTORY', 7 * 24 * 3600)),
+}
+cache_max_bytes = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+cache_backend_path = os.environ.get('CACHE_BACKEND_PATH')
+cache = KeywordCache(
+    cache_ttls,
+    max_bytes=cache_max_bytes,
+    stale_ttls=cache_stale_ttls,
+    backend=SQLiteCacheBackend(cache_backend_path, cache_max_bytes) if cache_backend_path else None
+)
+
+# Define the minimum delay between requests (in seconds); the default rate of
+# the Trends and SERP token buckets below
 min_request_delay = 5  # Adjust this as needed
 
-# Initialize the TrendReq object outside of the functions
-pytrends = TrendReq(hl='en-US', tz=360)
-
-def make_google_request(keyword, country_code):
-    try:
-        request_key = f"{keyword}_{country_code}"
-
-        # Check if the request is already cached
-        if request_key in cache:
-            print("Using cached data...")
-            return cache[request_key]
-
-        # Initialize the TrendReq object inside the function
-        pytrends = TrendReq(hl='en-US', tz=360, geo=country_code.upper())
-
-        # Make your Google request here using pytrends or any other method you prefer
-        # Specify the keywords you want to query in a list
-        keywords = [keyword]
+# Identical upstream calls that are in flight at the same time are made once
+upstream_calls = SingleFlight()
+
+# Thread pool used by the overview endpoints to fan out upstream calls
+upstream_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('UPSTREAM_MAX_WORKERS', 16)))
+
+# Per-source timeouts (in seconds) for the overview fan-out
+source_timeouts = {
+    'serp': float(os.environ.get('SERP_TIMEOUT', 20)),
+    'trends': float(os.environ.get('TRENDS_TIMEOUT', 20)),
+    'interest': float(os.environ.get('INTEREST_TIMEOUT', 20)),
+    'trend_history': float(os.environ.get('TREND_HISTORY_TIMEOUT', 10)),
+    'database': float(os.environ.get('DATABASE_TIMEOUT', 15)),
+    'exact_match': float(os.environ.get('EXACT_MATCH_TIMEOUT', 5)),
+}
+
+# Token buckets for each upstream. The bucket state lives in RATE_LIMIT_DIR,
+# so every gunicorn worker on this machine shares one budget per upstream.
+rate_limit_dir = os.environ.get('RATE_LIMIT_DIR', os.path.join(tempfile.gettempdir(), 'keyword-ideas-rate-limits'))
+rate_limiters = {
+    'trends': TokenBucket('trends', float(os.environ.get('TRENDS_RATE_LIMIT', 1 / min_request_delay)), state_dir=rate_limit_dir),
+    'serp': TokenBucket('serp', float(os.environ.get('SERP_RATE_LIMIT', 1 / min_request_delay)), state_dir=rate_limit_dir),
+    'rapidapi': TokenBucket('rapidapi', float(os.environ.get('RAPIDAPI_RATE_LIMIT', 5)), capacity=5, state_dir=rate_limit_dir),
+}
+
+# Warm pytrends clients, reused across requests for the same geo
+trends_clients = TrendsClientPool(
+    lambda geo: TrendReq(hl='en-US', tz=360, geo=geo),
+    size_per_geo=int(os.environ.get('TRENDS_CLIENTS_PER_GEO', 2))
+)
+
+# Trends lookups for the same geo arriving within this window (in seconds)
+# share one related-queries payload of up to five keywords
+trends_batcher = TrendsBatcher(
+    lambda geo, keywords: request_trends_batch(geo, keywords),
+    window=float(os.environ.get('TRENDS_BATCH_WINDOW', 0.1))
+)
+
+def format_interest_by_region(interest_by_region):
+    # Convert the data to a list of dictionaries
+    interest_data_list = []
+    for index, value in interest_by_region.items():
+        interest_data_list.append({"region": index, "interest": int(value)})  # Convert interest to int
+
+    # Format the data into a dictionary
+    return {"Interest Google Trends Data": interest_data_list}
+
+def request_trends_batch(geo, keywords):
+    # One pooled client and one payload serve related queries for every
+    # keyword in the batch. Returns {keyword: bundle}; both halves of each
+    # bundle are cached for their own lookups. Google scales interest by
+    # region against every keyword in the payload, so it is only part of the
+    # bundle when the batch holds a single keyword; otherwise the interest
+    # lookup fetches it on its own (request_interest_by_region) and the
+    # related queries are not held back by it.
+    def work(pytrends):
+        # Wait for this call's turn under the shared Google Trends rate limit
+        rate_limiters['trends'].acquire(timeout=source_timeouts['trends'])
 
         # Build payload with the specified keywords
         pytrends.build_payload(kw_list=keywords)
 
         # Get related queries using pytrends
-        data = pytrends.related_queries()
+        related_queries = pytrends.related_queries()
+
+        # Get "Interest by Region" data from the same payload; related
+        # queries are still returned when this part fails
+        interest_by_region_data = None
+        if len(keywords) == 1:
+            try:
+                rate_limiters['trends'].acquire(timeout=source_timeouts['interest'])
+                interest_by_region_data = pytrends.interest_by_region(resolution='COUNTRY', inc_geo_code=False)
+            except Exception as e:
+                print(f"Interest by region failed for {keywords}: {str(e)}")
+        return related_queries, interest_by_region_data
+
+    related_queries, interest_by_region_data = trends_clients.run(geo, work)
+
+    bundles = {}
+    for keyword in keywords:
+        bundle = {'trends': {keyword: related_queries.get(keyword, {})}}
+        if interest_by_region_data is not None and keyword in interest_by_region_data:
+            bundle['interest'] = format_interest_by_region(interest_by_region_data[keyword])
+
+        request_key = f"{keyword}_{geo.lower()}"
+        for source, value in bundle.items():
+            cache.set(source, request_key, value)
+        bundles[keyword] = bundle
+    return bundles
+
+def request_interest_by_region(geo, keyword):
+    # Interest by region from a payload holding only `keyword`
+    def work(pytrends):
+        rate_limiters['trends'].acquire(timeout=source_timeouts['interest'])
+        pytrends.build_payload(kw_list=[keyword])
+        return pytrends.interest_by_region(resolution='COUNTRY', inc_geo_code=False)
+
+    interest_by_region_data = trends_clients.run(geo, work)
+    if keyword not in interest_by_region_data:
+        raise KeyError(f"No interest by region returned for '{keyword}'")
+    return format_interest_by_region(interest_by_region_data[keyword])
+
+def fetch_trends_bundle(keyword, country_code):
+    # Concurrent related-queries and interest lookups for the same keyword
+    # (the overview fan-out starts both at once) share one bundle, and
+    # lookups for different keywords in the same geo share one batch
+    return upstream_calls.do(
+        ('trends_bundle', keyword, country_code),
+        lambda: trends_batcher.submit(country_code.upper(), keyword)
+    )
+
+def fetch_interest_bundle(keyword, country_code):
+    # Interest by region comes with the related queries when the keyword had
+    # its batch to itself, and from a payload of its own otherwise (or when
+    # that part of the batch failed)
+    bundle = fetch_trends_bundle(keyword, country_code)
+    if 'interest' in bundle:
+        return bundle['interest']
+    return request_interest_by_region(country_code.upper(), keyword)
 
-        # Add a delay to respect rate limits
-        time.sleep(min_request_delay)
+def make_google_request(keyword, country_code):
+    try:
+        request_key = f"{keyword}_{country_code}"
 
-        # Cache the response data
-        cache[request_key] = data
+        # Check if the request is already cached
+        cached_data = cache.get('trends', request_key)
+        if cached_data is not None:
+            print("Using cached data...")
+            return cached_data
 
-        return data
+        # Concurrent requests for the same keyword share one upstream call
+        return fetch_trends_bundle(keyword, country_code)['trends']
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -174,95 +595,486 @@ def fetch_google_trends_data(keyword, country_code):
     except Exception as e:
         return {"error": str(e)}
 
-# Modify the fetch_interest_by_region_data function
-def fetch_interest_by_region_data(keyword, country_code):
+# Cache keys currently being refreshed in the background
+revalidating_keys = set()
+revalidating_lock = threading.Lock()
+
+def fetch_with_revalidation(source, key, fetch):
+    # Stale-while-revalidate: a fresh entry is returned as is, a stale one is
+    # returned immediately while `fetch` refreshes it in the background, and
+    # only a miss waits for `fetch`. Exceptions from `fetch` are not cached.
+    value, stale = cache.lookup(source, key)
+    if value is None:
+        # Concurrent misses for the same key share one upstream call
+        return upstream_calls.do((source, key), lambda: fetch_and_cache(source, key, fetch))
+
+    if stale:
+        with revalidating_lock:
+            if (source, key) in revalidating_keys:
+                return value
+            revalidating_keys.add((source, key))
+        upstream_executor.submit(revalidate_cache_entry, source, key, fetch)
+    return value
+
+def fetch_and_cache(source, key, fetch):
+    value = fetch()
+    cache.set(source, key, value)
+    return value
+
+def revalidate_cache_entry(source, key, fetch):
     try:
-        # Initialize the TrendReq object
-        pytrends = TrendReq(hl='en-US', tz=360, geo=country_code.upper())
-
-        # Specify the keyword you want to query
-        keywords = [keyword]
-
-        # Build payload with the specified keyword
-        pytrends.build_payload(kw_list=keywords)
-
-        # Get "Interest by Region" data
-        interest_by_region_data = pytrends.interest_by_region(resolution='COUNTRY', inc_geo_code=False)
-
-        # Convert the data to a list of dictionaries
-        interest_data_list = []
-        for index, row in interest_by_region_data.iterrows():
-            interest_data_list.append({"region": index, "interest": int(row[keyword])})  # Convert interest to int
-
-        # Format the data into a dictionary
-        formatted_data = {"Interest Google Trends Data": interest_data_list}
-
-        return formatted_data
+        cache.set(source, key, fetch())
+    except Exception as e:
+        print(f"Failed to refresh cached {source} data: {str(e)}")
+    finally:
+        with revalidating_lock:
+            revalidating_keys.discard((source, key))
 
+def fetch_interest_by_region_data(keyword, country_code):
+    try:
+        keyword = keyword.strip().lower()
+        country_code = country_code.strip().lower()
+        return fetch_with_revalidation(
+            'interest', f"{keyword}_{country_code}",
+            lambda: fetch_interest_bundle(keyword, country_code)
+        )
     except Exception as e:
         # Handle exceptions gracefully
         return {"Interest Google Trends Data": []}
     
-def fetch_country_serp_data(sanitized_keyword, sanitized_country, num_results=10):
-    try:
-        #ssanitized_country= "us"
-        request_key = f"{sanitized_keyword}_{num_results}_{sanitized_country}"
+def request_country_serp_data(sanitized_keyword, sanitized_country, num_results, start_position):
+    # Wait for this call's turn under the shared SERP rate limit
+    rate_limiters['serp'].acquire(timeout=source_timeouts['serp'])
 
-        # Check if the request is already cached
-        if request_key in cache:
-            print("Using cached data...")
-            return cache[request_key]
+    # Specify the search query and the country code
+    query = f"{sanitized_keyword} country:{sanitized_country}"
 
-        # Apply rate limiting and time delay
-        if 'last_request_time' in cache:
-            last_request_time = cache['last_request_time']
-            elapsed_time = time.time() - last_request_time
-            if elapsed_time < min_request_delay:
-                sleep_time = min_request_delay - elapsed_time
-                print(f"Sleeping for {sleep_time} seconds to respect rate limits...")
-                time.sleep(sleep_time)
+    start_position = int(start_position) - 1  # Adjust to 0-based index
+    results = Google.search(query, num=num_results)
 
-        # Specify the search query and the country code
-        query = f"{sanitized_keyword} country:{sanitized_country}"
+    end_position = min(start_position + int(num_results), len(results))
 
-        start_position = request.args.get('start', default='1')
-        num_results = request.args.get('num', default='10')
-
-        start_position = int(start_position) - 1  # Adjust to 0-based index
-        results = Google.search(query, num=num_results)
+    formatted_results = []
 
-        end_position = min(start_position + int(num_results), len(results))
+    for i in range(start_position, end_position):
+        result = results[i]
+        parsed_url = urlparse(result.link)
+        domain = parsed_url.netloc
+        formatted_results.append({
+            'position': i + 1,
+            'link': result.link,
+            'title': result.title,
+            'domain': domain
+        })
 
-        formatted_results = []
+    serp_analysis = {
+        "Date": datetime.today().strftime('%B %d, %Y'),
+        "Number of SERP Results": len(results),
+        "SERP Results (Top 100)": formatted_results
+    }
 
-        for i in range(start_position, end_position):
-            result = results[i]
-            parsed_url = urlparse(result.link)
-            domain = parsed_url.netloc
-            formatted_results.append({
-                'position': i + 1,
-                'link': result.link,
-                'title': result.title,
-                'domain': domain
-            })
+    return serp_analysis
 
-        serp_analysis = {
-            "Date": datetime.today().strftime('%B %d, %Y'),
-            "Number of SERP Results": len(results),
-            "SERP Results (Top 100)": formatted_results
-        }
+def fetch_country_serp_data(sanitized_keyword, sanitized_country, num_results=10, start_position=1):
+    try:
+        #ssanitized_country= "us"
+        request_key = f"{sanitized_keyword}_{num_results}_{start_position}_{sanitized_country}"
 
-        # Update the last_request_time in the cache
-        cache['last_request_time'] = time.time()
+        # Check if the request is already cached
+        cached_data = cache.get('serp', request_key)
+        if cached_data is not None:
+            print("Using cached data...")
+            return cached_data
 
-        # Cache the response data
-        cache[request_key] = serp_analysis
+        # Concurrent requests for the same search share one upstream call
+        return upstream_calls.do(('serp', request_key), lambda: fetch_and_cache(
+            'serp', request_key,
+            lambda: request_country_serp_data(sanitized_keyword, sanitized_country, num_results, start_position)
+        ))
 
-        return serp_analysis
+    except Exception as e:
+        return {'error': str(e)}
+   
+def request_keyword_trend_history(keyword):
+    rate_limiters['rapidapi'].acquire(timeout=source_timeouts['trend_history'])
+    data = rapidapi_client.get_json(keyword)
+    # An error body sent with a 200 must not be cached as "no history"
+    if not isinstance(data, list):
+        raise ValueError(f"Unexpected RapidAPI trend history payload: {str(data)[:200]}")
+
+    # Extract 'Month_Date_Year' and 'Search_Count' from each dictionary
+    formatted_data = []
+
+    for item in data:
+        if isinstance(item, dict):
+            month_date_year = item.get('Month_Date_Year')
+            search_count = item.get('Search_Count')
+
+            formatted_data.append({'Month_Date_Year': month_date_year, 'Search_Count': search_count})
+
+    form_data = []
+    for entry in formatted_data:
+        # Check if Month_Date_Year is None
+        if month_date_year is None:
+            form_data.append({"error": "Month_Date_Year is missing in the data."})
+        else:
+            form_data.append({'Month_Date_Year': entry["Month_Date_Year"], 'Search_Count': entry["Search_Count"]})
+    return form_data
 
+def fetch_keyword_trend_history(keyword):
+    try:
+        keyword = keyword.strip().lower()
+        return fetch_with_revalidation('trend_history', keyword, lambda: request_keyword_trend_history(keyword))
     except Exception as e:
         return {'error': str(e)}
+
+# Response labels for the columns of a googlekeywords_data_<cc> row, in order
+keyword_row_labels = [
+    "Keyword", "Avg. monthly searches", "Competition (indexed value)",
+    "Top of page bid (low range)", "Top of page bid (high range)",
+    "Searches: Dec 2022", "Searches: Jan 2023", "Searches: Feb 2023", "Searches: Mar 2023",
+    "Searches: Apr 2023", "Searches: May 2023", "Searches: Jun 2023", "Searches: Jul 2023",
+    "Searches: Aug 2023", "Searches: Sep 2023", "Searches: Oct 2023", "Searches: Nov 2023",
+]
+
+def format_keyword_row(keyword_data):
+    selected_data = dict(zip(keyword_row_labels, keyword_data))
+    selected_data["Updated"] = formatted_date  # Use the calculated date from one week ago
+    return selected_data
+
+def parse_ranking_args(args):
+    # Reads the optional filter/sort parameters of the keyword ideas endpoints
+    # into KeywordStore.rank() arguments. Raises ValueError on bad input.
+    ranking = {}
+    for name in ['min_volume', 'max_volume', 'min_competition', 'max_competition',
+                 'min_low_bid', 'max_low_bid', 'min_high_bid', 'max_high_bid']:
+        value = args.get(name)
+        if value is not None:
+            # JSON bodies can carry lists, objects or booleans here
+            try:
+                if isinstance(value, bool):
+                    raise TypeError(name)
+                ranking[name] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {name} parameter.")
+            # nan would silently filter out every row
+            if not math.isfinite(ranking[name]):
+                raise ValueError(f"Invalid {name} parameter.")
+
+    sort_by = args.get('sort')
+    if sort_by is not None:
+        if not isinstance(sort_by, str) or sort_by not in SORT_FIELDS:
+            raise ValueError(f"Invalid sort parameter. Use one of: {', '.join(SORT_FIELDS)}.")
+        ranking['sort_by'] = sort_by
+
+    order = args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("Invalid order parameter. Use asc or desc.")
+    if 'sort_by' in ranking:
+        ranking['descending'] = order == 'desc'
+
+    limit = args.get('limit')
+    if limit is not None:
+        limit = str(limit)
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError("Invalid limit parameter.")
+        ranking['limit'] = int(limit)
+
+    return ranking
+
+def rank_related_rows(related_rows, ranking):
+    # Database results get a throwaway column store so they are filtered and
+    # sorted by the same vectorized code as the in-memory corpus
+    if not ranking or not related_rows:
+        return related_rows
+    store = KeywordStore.from_rows([row for row, _ in related_rows])
+    row_ids, scores = store.rank(np.arange(len(related_rows)), [score for _, score in related_rows], **ranking)
+    return [(related_rows[row_id][0], score) for row_id, score in zip(row_ids.tolist(), scores.tolist())]
+
+# Use the neighbor lists precomputed by keyword_neighbors.py when they exist.
+# Whether a country has them is rechecked every few minutes.
+keyword_neighbors_enabled = os.environ.get('KEYWORD_NEIGHBORS_ENABLED', '1') == '1'
+
+def fetch_precomputed_neighbors_batch(sanitized_keywords, sanitized_country):
+    # Returns {keyword: [(row, score), ...]} from the precomputed neighbor
+    # lists for the seeds that have one; seeds missing from the lists (or a
+    # country without lists) are left out
+    neighbors_table = f'googlekeywords_neighbors_{sanitized_country.lower()}'
+    # keyword_neighbors.py renames the index together with the table
+    neighbors_index = f'{neighbors_table}_keyword_idx'
+    if not sanitized_keywords or index_known_missing(neighbors_index):
+        return {}
+
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    with postgres_cursor() as cursor:
+        if cursor is None or not index_exists(cursor, neighbors_index, built_by='keyword_neighbors.py'):
+            return {}
+        # One index read on the lists, one exact-match index read per neighbor
+        cursor.execute(
+            f'SELECT n.keyword, t.*, n.score FROM {neighbors_table} n '
+            f'JOIN {table_name} t ON lower(trim(t."Keyword")) = n.neighbor '
+            'WHERE n.keyword = ANY(%s) ORDER BY n.keyword, n.score DESC',
+            (list(sanitized_keywords),)
+        )
+        rows = cursor.fetchall()
+
+    neighbors = {}
+    for row in rows:
+        neighbors.setdefault(row[0], []).append((row[1:-1], row[-1]))
+    return neighbors
+
+def fetch_precomputed_neighbors(sanitized_keyword, sanitized_country):
+    # Returns (row, score) pairs from the precomputed neighbor list, or None
+    # when the country has no list or the keyword is not in it. Every keyword
+    # in a list is its own neighbor, so a known keyword never comes back empty.
+    return fetch_precomputed_neighbors_batch([sanitized_keyword], sanitized_country).get(sanitized_keyword)
+
+def fetch_keyword_rows(sanitized_keyword, sanitized_country, ranking=None):
+    # Returns (row, score) pairs for the related keywords, or None when no
+    # database connection could be obtained. A keyword in the precomputed
+    # lists costs one indexed read; only the others are scored, against the
+    # in-memory corpus when it is loaded.
+    if keyword_neighbors_enabled:
+        neighbors = fetch_precomputed_neighbors(sanitized_keyword, sanitized_country)
+        if neighbors is not None:
+            return rank_related_rows(neighbors, ranking)
+
+    if keyword_corpus_enabled:
+        snapshot = keyword_corpus.get(sanitized_country)
+        if snapshot is not None:
+            return run_scoring(snapshot.related_rows, sanitized_keyword, ranking)
+
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+
+    # Borrow a pooled connection; it is returned as soon as the rows are read
+    with postgres_cursor() as cursor:
+        if cursor is None:
+            return None
+        candidate_rows = fetch_candidate_rows(cursor, table_name, sanitized_keyword)
+
+    # Each candidate is scored once and the score travels with its row
+    return rank_related_rows(run_scoring(score_related_rows, sanitized_keyword, candidate_rows), ranking)
+
+# Response formats of the keyword ideas endpoints' opt-in streaming mode
+stream_formats = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+def stream_keyword_rows(sanitized_keyword, sanitized_country, ranking=None):
+    # Yields (row, score) pairs as they are scored. Without ranking, rows come
+    # straight off a server-side cursor; sorting or filtering needs every row
+    # first, so ranked results are collected by fetch_keyword_rows.
+    if ranking:
+        keywords_data = fetch_keyword_rows(sanitized_keyword, sanitized_country, ranking)
+        if keywords_data is None:
+            raise RuntimeError("Failed to connect to the database.")
+        yield from keywords_data
+        return
+
+    if keyword_neighbors_enabled:
+        neighbors = fetch_precomputed_neighbors(sanitized_keyword, sanitized_country)
+        if neighbors is not None:
+            yield from neighbors
+            return
+
+    if keyword_corpus_enabled:
+        snapshot = keyword_corpus.get(sanitized_country)
+        if snapshot is not None:
+            yield from run_scoring(snapshot.related_rows, sanitized_keyword)
+            return
+
+    yield from iter_related_rows(sanitized_keyword, stream_candidate_rows(sanitized_keyword, sanitized_country))
+
+def streamed_keyword_ideas(sanitized_keyword, sanitized_country, ranking, stream_format):
+    # ndjson sends one related keyword per line and ends with a
+    # {"Total Related Keywords": n} line. json sends the usual response as a
+    # chunked array, with the total moved to the end of "Related Keywords"
+    # since it is only known once every row has been sent.
+    keywords_data = stream_keyword_rows(sanitized_keyword, sanitized_country, ranking)
+
+    # Pull the first row before answering so a database failure is still a 500
+    try:
+        first = next(keywords_data)
+    except StopIteration:
+        first = None
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        total = 0
+        try:
+            if first is None:
+                rows = iter(())
+            else:
+                rows = itertools.chain([first], keywords_data)
+
+            if stream_format == 'ndjson':
+                for keyword_data, similarity_ratio in rows:
+                    total += 1
+                    yield json.dumps(format_keyword_row(keyword_data)) + "\n"
+                yield json.dumps({"Total Related Keywords": total}) + "\n"
+                return
+
+            if first is None:
+                yield json.dumps([{"Related Keywords": "No closely related keywords found in the database."}])
+                return
+            yield '[{"Related Keywords": ['
+            for keyword_data, similarity_ratio in rows:
+                total += 1
+                yield json.dumps(format_keyword_row(keyword_data)) + ", "
+            yield json.dumps({"Total Related Keywords": total}) + ']}]'
+        finally:
+            # Hands the pooled connection back if the client disconnects early
+            keywords_data.close()
+
+    return Response(stream_with_context(generate()), mimetype=stream_formats[stream_format])
+
+def run_concurrently(calls):
+    # calls maps a source name to (function, args, fallback). Every call starts
+    # at once; a source that fails or exceeds its timeout gets its fallback.
+    started = time.monotonic()
+    futures = {name: upstream_executor.submit(func, *args) for name, (func, args, fallback) in calls.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = source_timeouts[name] - (time.monotonic() - started)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            # The call keeps running in the background and still fills the cache
+            print(f"{name} did not answer within {source_timeouts[name]} seconds, using fallback")
+            results[name] = calls[name][2]
+        except Exception as e:
+            print(f"{name} failed: {str(e)}")
+            results[name] = calls[name][2]
+    return results
+
+def fetch_overview_sources(keyword, sanitized_keyword, sanitized_country, start_position=1, num_results=10):
+    return run_concurrently({
+        'serp': (fetch_country_serp_data, (sanitized_keyword, sanitized_country, num_results, start_position),
+                 {'error': "SERP data is not available right now."}),
+        'trends': (fetch_google_trends_data, (sanitized_keyword, sanitized_country),
+                   {'error': "Google Trends data is not available right now."}),
+        'interest': (fetch_interest_by_region_data, (sanitized_keyword, sanitized_country),
+                     {"Interest Google Trends Data": []}),
+        'trend_history': (fetch_keyword_trend_history, (keyword,),
+                          {'error': "Keyword trend history is not available right now."}),
+        'database': (fetch_keyword_rows, (sanitized_keyword, sanitized_country), None),
+        'exact_match': (fetch_exact_match_row, (sanitized_keyword, sanitized_country), None),
+    })
+
+def build_keyword_overview(keyword, sanitized_keyword, sanitized_country, start_position='1', num_results='10'):
+    # The whole overview analysis; returns (response, status code). Used by
+    # the overview routes directly and by the job queue in job mode.
+    # Query the database and every upstream source at the same time, so the
+    # request takes roughly as long as the slowest of them
+    sources = fetch_overview_sources(
+        keyword, sanitized_keyword, sanitized_country,
+        start_position=start_position,
+        num_results=num_results
+    )
+    serp_analysis = sources['serp']
+    google_trends_data = sources['trends']
+    interest_data = sources['interest']
+    form_data = sources['trend_history']
+    keywords_data = sources['database']
+    if keywords_data is None:
+        return {"error": "Failed to connect to the database."}, 500
+
+    print(".................")
+    print(len(keywords_data))
+
+    exact_match_data = None
+    related_data = []
+
+    # The exact match comes from its own indexed lookup, not the candidates
+    if sources['exact_match'] is not None:
+        exact_match_data = format_keyword_row(sources['exact_match'])
+
+    for data, similarity_ratio in keywords_data:
+        if len(data[0].strip()) > 2:  # Exclude very short words
+            related_data.append((data, similarity_ratio))
+
+    total_related_keywords = len(related_data)
+    #print(related_data)
+
+    response = []
+
+    if exact_match_data:
+        response.append({"Keyword Overview": exact_match_data})
+    else:
+        response.append({"Keyword Overview": "No data found in the database for Keyword Overview."})
+
+    # Filter and append only closely related keywords
+    filtered_related_data = []
+    for keyword_data, similarity_ratio in related_data:
+        filtered_related_data.append(format_keyword_row(keyword_data))
+        #print (filtered_related_data)
+    if filtered_related_data:
+        filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
+        response.append({"Related Keywords": filtered_related_data})
+        response.append({"Your Targeted Keword Trending History On Google": form_data })  # Add RapidAPI data to the response
+        response.append({"SERP Analysis": serp_analysis})
+        # Append Google Trends data to the response
+        response.append({"Google Trends Data": google_trends_data})
+        response.append({"Interest Google Trends Data": interest_data})
+        fulldata = "Keyword Overview full analysis with SERP Analysis, Keword Trending History, related Queries and keyword intrest by region On Google Trends, Related Keywords data."
+        response.append({"Comprehensive Keyword Analysis": fulldata })
+
+    else :
+        response.append({"Related Keywords": "No closely related keywords found in the database."})
+        response.append({"Your Targeted Keword Trending History On Google": "No closely Your Targeted Keword Trending History On Google" })  # Add RapidAPI data to the response
+        response.append({"SERP Analysis": "Sorry serp_analysis is not found. Please try after some time"})
    
+    ordered_response = [
+         response_item
+        for name in ["Comprehensive Keyword Analysis", "Keyword Overview", "SERP Analysis", "Your Targeted Keword Trending History On Google", "Interest Google Trends Data", "Google Trends Data", "Total Related Keywords", "Related Keywords"]
+       if (response_item := next((item for item in response if name in item), None))
+       
+ ]
+    return ordered_response, 200
+
+def run_queued_job(kind, params):
+    if kind == 'keyword_overview':
+        return build_keyword_overview(**params)
+    raise ValueError(f"Unknown job kind '{kind}'")
+
+# Overview analyses queued with ?job=1. The queue lives in a local SQLite file
+# shared by every gunicorn worker; each worker process runs JOB_WORKERS threads.
+job_queue = JobQueue(
+    os.environ.get('JOB_QUEUE_PATH', os.path.join(tempfile.gettempdir(), 'keyword-ideas-jobs.sqlite3')),
+    run_queued_job,
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    result_ttl=float(os.environ.get('JOB_RESULT_TTL', 3600)),
+    # Comma-separated hosts that may receive callbacks even though they
+    # resolve to private addresses, e.g. an internal webhook receiver
+    allowed_callback_hosts=[host.strip() for host in os.environ.get('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()]
+)
+
+def submit_overview_job(keyword, sanitized_keyword, sanitized_country, start_position, num_results):
+    callback_url = request.args.get('callback_url')
+    try:
+        job_id = job_queue.submit('keyword_overview', {
+            'keyword': keyword,
+            'sanitized_keyword': sanitized_keyword,
+            'sanitized_country': sanitized_country,
+            'start_position': start_position,
+            'num_results': num_results,
+        }, callback_url)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid callback_url parameter: {str(e)}."}), 400
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+
+# Route to poll a queued overview analysis; "result" appears once it is done
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id."}), 404
+    return jsonify(job)
+
+@app.route('/job_stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats())
+
 # Route to fetch keyword data and SERP data from the MySQL database
 @app.route('/keyword_overview_Data', methods=['GET'])
 def get_keyword_data():
@@ -286,211 +1098,17 @@ def get_keyword_data():
             return jsonify({"error": "Invalid country code."}), 400
         
         sanitized_country = country.strip().lower()
-        # Call the fetch_country_serp_data function with the correct parameter names
-        serp_analysis = fetch_country_serp_data(sanitized_keyword, sanitized_country, num_results=10)
-
-        # Fetch Google Trends data
-        google_trends_data = fetch_google_trends_data(sanitized_keyword, sanitized_country)
-        # Append Interest by Region data to the response
-        interest_data = fetch_interest_by_region_data(sanitized_keyword, sanitized_country)
-        
-        # Create a database connection
-        db_connection = connect_to_postgres()
-        if db_connection is None:
-            return jsonify({"error": "Failed to connect to the database."}), 500
-
-        cursor = db_connection.cursor()
-        print("Connected to MySQL!////")
-        print(cursor)
-    
-        # Construct the table name based on the selected country
-        table_name = f'googlekeywords_data_{sanitized_country.lower()}'
-
-        
-
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name} ORDER BY RANDOM() LIMIT {num_rows}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
-
-        print(".................")
-        print(len(keywords_data))
-
-        # Use a parameterized query to select data from the table
-        #query = 'SELECT * FROM %s'
-        #cursor.execute(query, (table_name,))
-        #keywords_data = cursor.fetchall()
-
-        exact_match_data = None
-        related_data = []
-
-        for keyword_data in keywords_data:
-           
-            if keyword_data and isinstance(keyword_data[0], str):  # Assuming 'Keyword' is the second column
-                keyword_lower = keyword_data[0].strip().lower()  # Update index if needed
-                
-                if sanitized_keyword == keyword_lower:
-                    #print (sanitized_keyword == keyword_lower)
-                    selected_data = {
-                        "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                    }
-                    exact_match_data = selected_data
-                    
-                    break  # Exit the loop after finding an exact match
-
-        for data in keywords_data:
-            if data and isinstance(data[0], str):  # Assuming 'Keyword' is the second column
-                
-                similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, data[0].strip().lower()).ratio()
-                if similarity_ratio >= 0.8 and len(data[0].strip()) > 2:  # Exclude very short words
-                    related_data.append(data)
-
-        total_related_keywords = len(related_data)
-        #print(related_data)
-        #Fetch SERP data
-        """try:
-            start_position = request.args.get('start', default='1')
-            num_results = request.args.get('num', 'us', default='1')
-
-            start_position = int(start_position) - 1  # Adjust to 0-based index
-            results = Google.search(keyword, num=num_results)
-
-            end_position = min(start_position + int(num_results), len(results))
-
-            formatted_results = []
-            #print(formatted_results)
-            for i in range(start_position, end_position):
-                result = results[i]
-                parsed_url = urlparse(result.link)
-                domain = parsed_url.netloc
-                formatted_results.append({
-                    'position': i + 1,
-                    'link': result.link,
-                    'title': result.title,
-                    'domain': domain
-                })
-
-            serp_analysis = {
-                "Date": datetime.today().strftime('%B %d, %Y'),
-                "Number of SERP Results": len(results),
-                "SERP Results (Top 100)": formatted_results
-            }
-
-        except Exception as e:
-            serp_analysis = {'error': str(e)}"""
+        start_position = request.args.get('start', default='1')
+        num_results = request.args.get('num', default='10')
 
-        # Fetch RapidAPI data
-        try:
-            rapidapi_url = f"https://targeted-keyword-trend.p.rapidapi.com/{keyword}"  # Replace {keyword} with the actual keyword parameter
-            headers = {
-                "X-RapidAPI-Key": RAPIDAPI_KEY,
-                "X-RapidAPI-Host": "targeted-keyword-trend.p.rapidapi.com"
-            }
-            response = requests.get(rapidapi_url, headers=headers)
-            data = response.json()
-            # Extract 'Month_Date_Year' and 'Search_Count' from each dictionary
-            formatted_data = []
-            
-            for item in data:
-               # print (data)
-                if isinstance(item, dict):
-                   month_date_year = item.get('Month_Date_Year')
-                   search_count = item.get('Search_Count')
-                   
-                   formatted_data.append({'Month_Date_Year': month_date_year, 'Search_Count': search_count})
-
-            form_data = []
-            for entry in formatted_data:
-               # Check if Month_Date_Year is None
-                if month_date_year is None:
-                    #return jsonify({"error": "Month_Date_Year is missing in the data."}), 400
-                     form_data.append({"error": "Month_Date_Year is missing in the data."})
-                else :
-                    form_data.append({'Month_Date_Year': entry["Month_Date_Year"], 'Search_Count': entry["Search_Count"]})
-        except Exception as e:
-            form_data = {'error': str(e)}
-            
-        response = []
+        # ?job=1 queues the analysis and answers with a job id right away
+        if request.args.get('job') == '1':
+            return submit_overview_job(keyword, sanitized_keyword, sanitized_country, start_position, num_results)
 
-        if exact_match_data:
-            response.append({"Keyword Overview": exact_match_data})
-        else:
-            response.append({"Keyword Overview": "No data found in the database for Keyword Overview."})
-
-        # Filter and append only closely related keywords
-        filtered_related_data = []
-        for keyword_data in related_data:
-            
-            keyword = keyword_data[0].strip().lower()
-            
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            #if similarity_ratio >= 0.8 and len(keyword) > 2:  # Exclude very short words
-            filtered_related_data.append({
-                     "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                })
-            #print (filtered_related_data)
-        if filtered_related_data:
-            filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
-            response.append({"Related Keywords": filtered_related_data})
-            response.append({"Your Targeted Keword Trending History On Google": form_data })  # Add RapidAPI data to the response
-            response.append({"SERP Analysis": serp_analysis})
-            # Append Google Trends data to the response
-            response.append({"Google Trends Data": google_trends_data})
-            response.append({"Interest Google Trends Data": interest_data})
-            fulldata = "Keyword Overview full analysis with SERP Analysis, Keword Trending History, related Queries and keyword intrest by region On Google Trends, Related Keywords data."
-            response.append({"Comprehensive Keyword Analysis": fulldata })
-
-        else :
-            response.append({"Related Keywords": "No closely related keywords found in the database."})
-            response.append({"Your Targeted Keword Trending History On Google": "No closely Your Targeted Keword Trending History On Google" })  # Add RapidAPI data to the response
-            response.append({"SERP Analysis": "Sorry serp_analysis is not found. Please try after some time"})
-   
-        ordered_response = [
-             response_item
-            for name in ["Comprehensive Keyword Analysis", "Keyword Overview", "SERP Analysis", "Your Targeted Keword Trending History On Google", "Interest Google Trends Data", "Google Trends Data", "Total Related Keywords", "Related Keywords"]
-           if (response_item := next((item for item in response if name in item), None))
-           
-     ]
-         # Close the database connection
-        cursor.close()
-        db_connection.close()
+        response, status = build_keyword_overview(keyword, sanitized_keyword, sanitized_country, start_position, num_results)
 
         # Return the response
-        return jsonify(ordered_response)
+        return jsonify(response), status
 
     except Exception as e:
         datae = {"message": "Sorry.. No data found in my Database. if you try after 1 min, get big Keyword Research Data... or try another country"}
@@ -521,24 +1139,26 @@ def semrush_keyword_Data():
         sanitized_country = country.strip().lower()
 
         # Construct the table name based on the selected country
-        table_name = f'google_keyword_data_{sanitized_country.lower()}'
+        table_name = f'googlekeywords_data_{sanitized_country.lower()}'
 
-        # Create a database connection
-        db_connection = connect_to_postgres()
-        if db_connection is None:
+        # Optional volume/competition/bid filters, sort order and top-N
+        try:
+            ranking = parse_ranking_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Opt-in streaming: ?stream=ndjson or ?stream=json
+        stream_format = request.args.get('stream')
+        if stream_format is not None:
+            if stream_format not in stream_formats:
+                return jsonify({"error": "Invalid stream parameter. Use ndjson or json."}), 400
+            return streamed_keyword_ideas(sanitized_keyword, sanitized_country, ranking, stream_format)
+
+        # Pull only the rows that can reach the similarity threshold
+        keywords_data = fetch_keyword_rows(sanitized_keyword, sanitized_country, ranking)
+        if keywords_data is None:
             return jsonify({"error": "Failed to connect to the database."}), 500
 
-        cursor = db_connection.cursor()
-        print("Connected to MySQL!////")
-        print(cursor)
-    
-        # Construct the table name based on the selected country
-        table_name = f'googlekeywords_data_{sanitized_country.lower()}'
-# Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name} ORDER BY RANDOM() LIMIT {num_rows}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
-
         print(".................")
         print(len(keywords_data))
 
@@ -550,30 +1170,8 @@ def semrush_keyword_Data():
 
          # Filter and append only closely related keywords
         filtered_related_data = []
-        for keyword_data in keywords_data:
-            keyword = keyword_data[0].strip().lower()
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            if similarity_ratio >= 0.8:  # Exclude very short words
-                filtered_related_data.append({
-                    "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-               })
+        for keyword_data, similarity_ratio in keywords_data:
+            filtered_related_data.append(format_keyword_row(keyword_data))
 
         if filtered_related_data:
             filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
@@ -588,10 +1186,6 @@ def semrush_keyword_Data():
             if (response_item := next((item for item in response if name in item), None))
         ]
 
-         # Close the database connection
-        cursor.close()
-        db_connection.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -622,204 +1216,17 @@ def get_google_keyword_data():
             return jsonify({"error": "Invalid country code."}), 400
         
         sanitized_country = country.strip().lower()
-        # Call the fetch_country_serp_data function with the correct parameter names
-        serp_analysis = fetch_country_serp_data(sanitized_keyword, sanitized_country, num_results=10)
-
-        # Fetch Google Trends data
-        google_trends_data = fetch_google_trends_data(sanitized_keyword, sanitized_country)
-        # Append Interest by Region data to the response
-        interest_data = fetch_interest_by_region_data(sanitized_keyword, sanitized_country)
-
-        # Create a database connection
-        db_connection = connect_to_postgres()
-        if db_connection is None:
-            return jsonify({"error": "Failed to connect to the database."}), 500
-
-        cursor = db_connection.cursor()
-        print("Connected to MySQL!////")
-        print(cursor)
-    
-        # Construct the table name based on the selected country
-        table_name = f'googlekeywords_data_{sanitized_country.lower()}'
-
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name} ORDER BY RANDOM() LIMIT {num_rows}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
-
-        print(".................")
-        print(len(keywords_data))
-
-        exact_match_data = None
-        related_data = []
-
-        for keyword_data in keywords_data:
-           
-            if keyword_data and isinstance(keyword_data[0], str):  # Assuming 'Keyword' is the second column
-                keyword_lower = keyword_data[0].strip().lower()  # Update index if needed
-                
-                if sanitized_keyword == keyword_lower:
-                    #print (sanitized_keyword == keyword_lower)
-                    selected_data = {
-                        "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                    }
-                    exact_match_data = selected_data
-                    
-                    break  # Exit the loop after finding an exact match
-
-        for data in keywords_data:
-            if data and isinstance(data[0], str):  # Assuming 'Keyword' is the second column
-                
-                similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, data[0].strip().lower()).ratio()
-                if similarity_ratio >= 0.8 and len(data[0].strip()) > 2:  # Exclude very short words
-                    related_data.append(data)
-
-        total_related_keywords = len(related_data)
-        #print(related_data)
-        #Fetch SERP data
-        """try:
-            start_position = request.args.get('start', default='1')
-            num_results = request.args.get('num', 'us', default='1')
-
-            start_position = int(start_position) - 1  # Adjust to 0-based index
-            results = Google.search(keyword, num=num_results)
-
-            end_position = min(start_position + int(num_results), len(results))
-
-            formatted_results = []
-            #print(formatted_results)
-            for i in range(start_position, end_position):
-                result = results[i]
-                parsed_url = urlparse(result.link)
-                domain = parsed_url.netloc
-                formatted_results.append({
-                    'position': i + 1,
-                    'link': result.link,
-                    'title': result.title,
-                    'domain': domain
-                })
-
-            serp_analysis = {
-                "Date": datetime.today().strftime('%B %d, %Y'),
-                "Number of SERP Results": len(results),
-                "SERP Results (Top 100)": formatted_results
-            }
-
-        except Exception as e:
-            serp_analysis = {'error': str(e)}"""
-
-        # Fetch RapidAPI data
-        try:
-            rapidapi_url = f"https://targeted-keyword-trend.p.rapidapi.com/{keyword}"  # Replace {keyword} with the actual keyword parameter
-            headers = {
-                "X-RapidAPI-Key": RAPIDAPI_KEY,
-                "X-RapidAPI-Host": "targeted-keyword-trend.p.rapidapi.com"
-            }
-            response = requests.get(rapidapi_url, headers=headers)
-            data = response.json()
-            # Extract 'Month_Date_Year' and 'Search_Count' from each dictionary
-            formatted_data = []
-            
-            for item in data:
-               # print (data)
-                if isinstance(item, dict):
-                   month_date_year = item.get('Month_Date_Year')
-                   search_count = item.get('Search_Count')
-                   
-                   formatted_data.append({'Month_Date_Year': month_date_year, 'Search_Count': search_count})
-
-            form_data = []
-            for entry in formatted_data:
-               # Check if Month_Date_Year is None
-                if month_date_year is None:
-                    #return jsonify({"error": "Month_Date_Year is missing in the data."}), 400
-                     form_data.append({"error": "Month_Date_Year is missing in the data."})
-                else :
-                    form_data.append({'Month_Date_Year': entry["Month_Date_Year"], 'Search_Count': entry["Search_Count"]})
-        except Exception as e:
-            form_data = {'error': str(e)}
-            
-        response = []
+        start_position = request.args.get('start', default='1')
+        num_results = request.args.get('num', default='10')
 
-        if exact_match_data:
-            response.append({"Keyword Overview": exact_match_data})
-        else:
-            response.append({"Keyword Overview": "No data found in the database for Keyword Overview."})
+        # ?job=1 queues the analysis and answers with a job id right away
+        if request.args.get('job') == '1':
+            return submit_overview_job(keyword, sanitized_keyword, sanitized_country, start_position, num_results)
 
-        # Filter and append only closely related keywords
-        filtered_related_data = []
-        for keyword_data in related_data:
-            
-            keyword = keyword_data[0].strip().lower()
-            
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            #if similarity_ratio >= 0.8 and len(keyword) > 2:  # Exclude very short words
-            filtered_related_data.append({
-                    "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                })
-            #print (filtered_related_data)
-        if filtered_related_data:
-            filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
-            response.append({"Related Keywords": filtered_related_data})
-            response.append({"Your Targeted Keword Trending History On Google": form_data })  # Add RapidAPI data to the response
-            response.append({"SERP Analysis": serp_analysis})
-            # Append Google Trends data to the response
-            response.append({"Google Trends Data": google_trends_data})
-            response.append({"Interest Google Trends Data": interest_data})
-            fulldata = "Keyword Overview full analysis with SERP Analysis, Keword Trending History, related Queries and keyword intrest by region On Google Trends, Related Keywords data."
-            response.append({"Comprehensive Keyword Analysis": fulldata })
-
-        else :
-            response.append({"Related Keywords": "No closely related keywords found in the database."})
-            response.append({"Your Targeted Keword Trending History On Google": "No closely Your Targeted Keword Trending History On Google" })  # Add RapidAPI data to the response
-            response.append({"SERP Analysis": "Sorry serp_analysis is not found. Please try after some time"})
-   
-        ordered_response = [
-             response_item
-            for name in ["Comprehensive Keyword Analysis", "Keyword Overview", "SERP Analysis", "Your Targeted Keword Trending History On Google", "Interest Google Trends Data", "Google Trends Data", "Total Related Keywords", "Related Keywords"]
-           if (response_item := next((item for item in response if name in item), None))
-           
-     ]
-         # Close the database connection
-        cursor.close()
-        db_connection.close()
+        response, status = build_keyword_overview(keyword, sanitized_keyword, sanitized_country, start_position, num_results)
 
         # Return the response
-        return jsonify(ordered_response)
+        return jsonify(response), status
 
     except Exception as e:
         datae = {"message": "Sorry.. No data found in my Database. if you try after 1 min, get big Keyword Research Data... or try another country"}
@@ -848,22 +1255,26 @@ def google_keyword_Data():
             return jsonify({"error": "Invalid country code."}), 400
         
         sanitized_country = country.strip().lower()
-        # Create a database connection
-        db_connection = connect_to_postgres()
-        if db_connection is None:
-            return jsonify({"error": "Failed to connect to the database."}), 500
-
-        cursor = db_connection.cursor()
-        print("Connected to MySQL!////")
-        print(cursor)
-    
         # Construct the table name based on the selected country
         table_name = f'googlekeywords_data_{sanitized_country.lower()}'
 
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name} ORDER BY RANDOM() LIMIT {num_rows}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
+        # Optional volume/competition/bid filters, sort order and top-N
+        try:
+            ranking = parse_ranking_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Opt-in streaming: ?stream=ndjson or ?stream=json
+        stream_format = request.args.get('stream')
+        if stream_format is not None:
+            if stream_format not in stream_formats:
+                return jsonify({"error": "Invalid stream parameter. Use ndjson or json."}), 400
+            return streamed_keyword_ideas(sanitized_keyword, sanitized_country, ranking, stream_format)
+
+        # Pull only the rows that can reach the similarity threshold
+        keywords_data = fetch_keyword_rows(sanitized_keyword, sanitized_country, ranking)
+        if keywords_data is None:
+            return jsonify({"error": "Failed to connect to the database."}), 500
 
         print(".................")
         print(len(keywords_data))
@@ -875,30 +1286,8 @@ def google_keyword_Data():
 
          # Filter and append only closely related keywords
         filtered_related_data = []
-        for keyword_data in keywords_data:
-            keyword = keyword_data[0].strip().lower()
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            if similarity_ratio >= 0.8:  # Exclude very short words
-                filtered_related_data.append({
-                   "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[2],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[4],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: Sep 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Oct 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Nov 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-               })
+        for keyword_data, similarity_ratio in keywords_data:
+            filtered_related_data.append(format_keyword_row(keyword_data))
 
         if filtered_related_data:
             filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
@@ -913,10 +1302,6 @@ def google_keyword_Data():
             if (response_item := next((item for item in response if name in item), None))
         ]
 
-         # Close the database connection
-        cursor.close()
-        db_connection.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -924,5 +1309,115 @@ def google_keyword_Data():
         datae = {"message": "Sorry.. No data found in my Database. if you try after 1 min, get big Keyword Research Data... or try another country"}
         return jsonify({'error': str(datae)}), 200
 
+# Largest number of seed keywords accepted by one batch request
+batch_max_keywords = int(os.environ.get('BATCH_MAX_KEYWORDS', 5000))
+
+def fetch_related_rows_batch(sanitized_keywords, sanitized_country, ranking=None):
+    # Returns {keyword: [(row, score), ...]} for many seeds, or None when no
+    # database connection could be obtained. Seeds in the precomputed lists
+    # are read with one query; the rest are scored against the in-memory
+    # corpus when it is loaded, otherwise on one pooled connection.
+    related = {}
+    if keyword_neighbors_enabled:
+        neighbors = fetch_precomputed_neighbors_batch(sanitized_keywords, sanitized_country)
+        related = {keyword: rank_related_rows(rows, ranking) for keyword, rows in neighbors.items()}
+    remaining = [keyword for keyword in sanitized_keywords if keyword not in related]
+    if not remaining:
+        return related
+
+    if keyword_corpus_enabled:
+        snapshot = keyword_corpus.get(sanitized_country)
+        if snapshot is not None:
+            related.update((keyword, run_scoring(snapshot.related_rows, keyword, ranking)) for keyword in remaining)
+            return related
+
+    table_name = f'googlekeywords_data_{sanitized_country.lower()}'
+    candidates = {}
+    with postgres_cursor() as cursor:
+        if cursor is None:
+            return None
+        for keyword in remaining:
+            candidates[keyword] = fetch_candidate_rows(cursor, table_name, keyword)
+
+    related.update(
+        (keyword, rank_related_rows(run_scoring(score_related_rows, keyword, rows), ranking))
+        for keyword, rows in candidates.items()
+    )
+    return related
+
+# Route to fetch related keywords for many seed keywords in one request
+@app.route('/keyword_ideas/batch', methods=['POST'])
+def keyword_ideas_batch():
+    try:
+        payload = request.get_json(silent=True)
+        if payload is None:
+            payload = {}
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Send a JSON body with a 'keywords' list and a 'country'."}), 400
+        keywords = payload.get('keywords')
+        country = payload.get('country')
+
+        # Check if keywords and country are missing or invalid
+        if not isinstance(keywords, list) or not keywords or not isinstance(country, str):
+            return jsonify({"error": "Send a JSON body with a 'keywords' list and a 'country'."}), 400
+        if len(keywords) > batch_max_keywords:
+            return jsonify({"error": f"At most {batch_max_keywords} keywords per request."}), 400
+
+        # Check if the provided country code is in the list of allowed countries
+        sanitized_country = country.strip().lower()
+        if sanitized_country not in allowed_countries:
+            return jsonify({"error": "Invalid country code."}), 400
+
+        # The ranking parameters of /keyword_ideas apply to every seed; they
+        # may be sent in the query string or in the JSON body
+        ranking_args = dict(request.args.items())
+        ranking_args.update(payload)
+        try:
+            ranking = parse_ranking_args(ranking_args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        valid_keywords = []
+        for keyword in keywords:
+            if isinstance(keyword, str) and re.match(r'^[a-zA-Z\s]+$', keyword):
+                valid_keywords.append(keyword.strip().lower())
+
+        # Duplicate seeds are scored once
+        related = fetch_related_rows_batch(list(dict.fromkeys(valid_keywords)), sanitized_country, ranking)
+        if related is None:
+            return jsonify({"error": "Failed to connect to the database."}), 500
+
+        response = []
+        for keyword in keywords:
+            if not isinstance(keyword, str) or not re.match(r'^[a-zA-Z\s]+$', keyword):
+                response.append({"Keyword": keyword, "error": "Invalid keyword parameter."})
+                continue
+
+            filtered_related_data = [format_keyword_row(keyword_data) for keyword_data, similarity_ratio in related[keyword.strip().lower()]]
+            if filtered_related_data:
+                filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
+                response.append({"Keyword": keyword, "Related Keywords": filtered_related_data})
+            else:
+                response.append({"Keyword": keyword, "Related Keywords": "No closely related keywords found in the database."})
+
+        return jsonify(response)
+
+    except Exception as e:
+        datae = {"message": "Sorry.. No data found in my Database. if you try after 1 min, get big Keyword Research Data... or try another country"}
+        return jsonify({'error': str(datae)}), 200
+
+@app.route('/rate_limit_stats', methods=['GET'])
+def rate_limit_stats():
+    # Queue depth and wait times of the upstream rate limiters in this worker
+    stats = {name: limiter.stats() for name, limiter in rate_limiters.items()}
+    stats['trends_batches'] = trends_batcher.stats()
+    stats['rapidapi_circuit'] = rapidapi_client.breaker.state
+    return jsonify(stats)
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    # Hit/miss/eviction counters of this worker's cache
+    return jsonify(dict(cache.stats(), single_flight=upstream_calls.stats()))
+
 if __name__ == '__main__':
     app.run(debug=True)
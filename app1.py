@@ -1,5 +1,5 @@
 from flask import Flask, request, jsonify
-import difflib, os, re, requests
+import os, re, requests
 from flask_mysqldb import MySQL
 from googlesearcher import Google
 from urllib.parse import urlparse
@@ -7,6 +7,8 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pytrends.request import TrendReq
 import cachetools, requests, time
+import MySQLdb.cursors
+from keyword_similarity import iter_related_rows
 
 """
 CREATE TABLE google_keyword_data_in (
@@ -58,6 +60,61 @@ RAPIDAPI_HOST = 'targeted-keyword-trend.p.rapidapi.com'
 # Define a list of allowed country codes
 allowed_countries = ['us', 'uk', 'ca', 'in']  # Add more as needed
 
+# Rows fetched per round trip when streaming a country table
+stream_batch_size = int(os.getenv('STREAM_BATCH_SIZE', 1000))
+
+def stream_keyword_table(table_name):
+    # Reads the table through an unbuffered (server-side) cursor in batches
+    # of stream_batch_size, so the worker never holds the whole table as
+    # tuples. The connection is busy until the generator is exhausted.
+    cursor = mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+    try:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        while True:
+            rows = cursor.fetchmany(stream_batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+# The exact-match index is built by keyword_migrate.py --mysql --indexes-only
+# and keyword_ingest.py --mysql, never on the request path. Whether it exists
+# is rechecked every few minutes, so one built later is picked up.
+index_check_interval = 300
+indexes_checked = {}  # table -> (exists, checked_at)
+
+def exact_match_index_exists(cursor, table_name):
+    exists, checked_at = indexes_checked.get(table_name, (False, 0))
+    if time.time() - checked_at < index_check_interval:
+        return exists
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table_name, f'{table_name}_keyword_lower_idx')
+    )
+    exists = cursor.fetchone() is not None
+    if not exists:
+        print(f"Exact-match index missing on {table_name}; build it with keyword_migrate.py --mysql --indexes-only")
+    indexes_checked[table_name] = (exists, time.time())
+    return exists
+
+def fetch_exact_match_row(table_name, sanitized_keyword):
+    # Returns the row whose normalized keyword equals sanitized_keyword, or
+    # None. The query expression matches the functional index, so this is an
+    # index lookup rather than a scan; ties resolve the same way every time.
+    cursor = mysql.connection.cursor()
+    try:
+        # Only logs when the index is missing; the query still answers without it
+        exact_match_index_exists(cursor, table_name)
+        cursor.execute(
+            f"SELECT * FROM {table_name} WHERE lower(trim(`Keyword`)) = %s ORDER BY `Keyword` LIMIT 1",
+            (sanitized_keyword,)
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
 # Define the initial date and update interval
 date_present = datetime(2023, 8, 25)
 update_interval = timedelta(days=10)
@@ -283,65 +340,43 @@ def get_keyword_data():
         google_trends_data = fetch_google_trends_data(sanitized_keyword, sanitized_country)
         # Append Interest by Region data to the response
         interest_data = fetch_interest_by_region_data(sanitized_keyword, sanitized_country)
-         # Create a MySQL connection
-        db_connection = mysql.connection
-        cursor = db_connection.cursor()
-        
-    
         # Construct the table name based on the selected country
         table_name = f'google_keyword_data_{sanitized_country.lower()}'
 
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
-
-        # Use a parameterized query to select data from the table
-        #query = 'SELECT * FROM %s'
-        #cursor.execute(query, (table_name,))
-        #keywords_data = cursor.fetchall()
-
         exact_match_data = None
         related_data = []
 
-        for keyword_data in keywords_data:
-           
-            if keyword_data and isinstance(keyword_data[0], str):  # Assuming 'Keyword' is the second column
-                keyword_lower = keyword_data[0].strip().lower()  # Update index if needed
-                
-                if sanitized_keyword == keyword_lower:
-                    #print (sanitized_keyword == keyword_lower)
-                    selected_data = {
-                        "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition": keyword_data[2],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                    }
-                    exact_match_data = selected_data
-                    
-                    break  # Exit the loop after finding an exact match
-
-        for data in keywords_data:
-            if data and isinstance(data[0], str):  # Assuming 'Keyword' is the second column
-                
-                similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, data[0].strip().lower()).ratio()
-                if similarity_ratio >= 0.8 and len(data[0].strip()) > 2:  # Exclude very short words
-                    related_data.append(data)
+        # The exact match comes from an indexed lookup. It runs before the
+        # stream is opened since the connection is busy until that finishes.
+        keyword_data = fetch_exact_match_row(table_name, sanitized_keyword)
+        if keyword_data is not None:
+            selected_data = {
+                "Keyword": keyword_data[0],  # Replace with appropriate column index
+                "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
+                "Competition": keyword_data[2],  # Replace with appropriate column index
+                "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
+                "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
+                "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
+                "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
+                "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
+                "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
+                "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
+                "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
+                "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
+                "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
+                "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
+                "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
+                "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
+                "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
+                "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
+                "Updated": formatted_date  # Use the calculated date from one week ago
+                }
+            exact_match_data = selected_data
+
+        # Stream the table through the similarity scorer; only the related rows are kept
+        for keyword_data, similarity_ratio in iter_related_rows(sanitized_keyword, stream_keyword_table(table_name)):
+            if len(keyword_data[0].strip()) > 2:  # Exclude very short words
+                related_data.append(keyword_data)
 
         total_related_keywords = len(related_data)
         #print(related_data)
@@ -418,11 +453,6 @@ def get_keyword_data():
         # Filter and append only closely related keywords
         filtered_related_data = []
         for keyword_data in related_data:
-            
-            keyword = keyword_data[0].strip().lower()
-            
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            #if similarity_ratio >= 0.8 and len(keyword) > 2:  # Exclude very short words
             filtered_related_data.append({
                     "Keyword": keyword_data[0],  # Replace with appropriate column index
                     "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
@@ -467,9 +497,6 @@ def get_keyword_data():
            if (response_item := next((item for item in response if name in item), None))
            
      ]
-        # Close the database connection
-        cursor.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -501,17 +528,9 @@ def semrush_keyword_Data():
         
         sanitized_country = country.strip().lower()
 
-         # Create a MySQL connection
-        db_connection = mysql.connection
-        cursor = db_connection.cursor()
-    
         # Construct the table name based on the selected country
         table_name = f'google_keyword_data_{sanitized_country.lower()}'
 
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
         if not table_name:
             # Handle the case where no data is found in the table
             return jsonify({"message": "No data found in the database."})
@@ -520,31 +539,29 @@ def semrush_keyword_Data():
 
          # Filter and append only closely related keywords
         filtered_related_data = []
-        for keyword_data in keywords_data:
-            keyword = keyword_data[0].strip().lower()
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            if similarity_ratio >= 0.8:  # Exclude very short words
-                filtered_related_data.append({
-                    "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition": keyword_data[2],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-               })
+        # Rows are scored as they stream in from the server-side cursor
+        for keyword_data, similarity_ratio in iter_related_rows(sanitized_keyword, stream_keyword_table(table_name)):
+            filtered_related_data.append({
+                "Keyword": keyword_data[0],  # Replace with appropriate column index
+                "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
+                "Competition": keyword_data[2],  # Replace with appropriate column index
+                "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
+                "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
+                "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
+                "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
+                "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
+                "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
+                "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
+                "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
+                "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
+                "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
+                "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
+                "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
+                "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
+                "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
+                "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
+                "Updated": formatted_date  # Use the calculated date from one week ago
+           })
 
         if filtered_related_data:
             filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
@@ -559,9 +576,6 @@ def semrush_keyword_Data():
             if (response_item := next((item for item in response if name in item), None))
         ]
 
-        # Close the database connection
-        cursor.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -599,65 +613,43 @@ def get_google_keyword_data():
         google_trends_data = fetch_google_trends_data(sanitized_keyword, sanitized_country)
         # Append Interest by Region data to the response
         interest_data = fetch_interest_by_region_data(sanitized_keyword, sanitized_country)
-         # Create a MySQL connection
-        db_connection = mysql.connection
-        cursor = db_connection.cursor()
-        
-    
         # Construct the table name based on the selected country
         table_name = f'google_keyword_data_{sanitized_country.lower()}'
 
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
-
-        # Use a parameterized query to select data from the table
-        #query = 'SELECT * FROM %s'
-        #cursor.execute(query, (table_name,))
-        #keywords_data = cursor.fetchall()
-
         exact_match_data = None
         related_data = []
 
-        for keyword_data in keywords_data:
-           
-            if keyword_data and isinstance(keyword_data[0], str):  # Assuming 'Keyword' is the second column
-                keyword_lower = keyword_data[0].strip().lower()  # Update index if needed
-                
-                if sanitized_keyword == keyword_lower:
-                    #print (sanitized_keyword == keyword_lower)
-                    selected_data = {
-                        "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition": keyword_data[2],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-                    }
-                    exact_match_data = selected_data
-                    
-                    break  # Exit the loop after finding an exact match
-
-        for data in keywords_data:
-            if data and isinstance(data[0], str):  # Assuming 'Keyword' is the second column
-                
-                similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, data[0].strip().lower()).ratio()
-                if similarity_ratio >= 0.8 and len(data[0].strip()) > 2:  # Exclude very short words
-                    related_data.append(data)
+        # The exact match comes from an indexed lookup. It runs before the
+        # stream is opened since the connection is busy until that finishes.
+        keyword_data = fetch_exact_match_row(table_name, sanitized_keyword)
+        if keyword_data is not None:
+            selected_data = {
+                "Keyword": keyword_data[0],  # Replace with appropriate column index
+                "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
+                "Competition": keyword_data[2],  # Replace with appropriate column index
+                "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
+                "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
+                "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
+                "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
+                "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
+                "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
+                "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
+                "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
+                "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
+                "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
+                "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
+                "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
+                "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
+                "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
+                "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
+                "Updated": formatted_date  # Use the calculated date from one week ago
+                }
+            exact_match_data = selected_data
+
+        # Stream the table through the similarity scorer; only the related rows are kept
+        for keyword_data, similarity_ratio in iter_related_rows(sanitized_keyword, stream_keyword_table(table_name)):
+            if len(keyword_data[0].strip()) > 2:  # Exclude very short words
+                related_data.append(keyword_data)
 
         total_related_keywords = len(related_data)
         #print(related_data)
@@ -734,11 +726,6 @@ def get_google_keyword_data():
         # Filter and append only closely related keywords
         filtered_related_data = []
         for keyword_data in related_data:
-            
-            keyword = keyword_data[0].strip().lower()
-            
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            #if similarity_ratio >= 0.8 and len(keyword) > 2:  # Exclude very short words
             filtered_related_data.append({
                     "Keyword": keyword_data[0],  # Replace with appropriate column index
                     "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
@@ -783,9 +770,6 @@ def get_google_keyword_data():
            if (response_item := next((item for item in response if name in item), None))
            
      ]
-        # Close the database connection
-        cursor.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -817,17 +801,9 @@ def google_keyword_Data():
         
         sanitized_country = country.strip().lower()
 
-         # Create a MySQL connection
-        db_connection = mysql.connection
-        cursor = db_connection.cursor()
-    
         # Construct the table name based on the selected country
         table_name = f'google_keyword_data_{sanitized_country.lower()}'
 
-        # Use string formatting to insert the table name into the SQL query
-        query = f"SELECT * FROM {table_name}"
-        cursor.execute(query)
-        keywords_data = cursor.fetchall()
         if not table_name:
             # Handle the case where no data is found in the table
             return jsonify({"message": "No data found in the database."})
@@ -836,31 +812,29 @@ def google_keyword_Data():
 
          # Filter and append only closely related keywords
         filtered_related_data = []
-        for keyword_data in keywords_data:
-            keyword = keyword_data[0].strip().lower()
-            similarity_ratio = difflib.SequenceMatcher(None, sanitized_keyword, keyword).ratio()
-            if similarity_ratio >= 0.8:  # Exclude very short words
-                filtered_related_data.append({
-                    "Keyword": keyword_data[0],  # Replace with appropriate column index
-                    "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
-                    "Competition": keyword_data[2],  # Replace with appropriate column index
-                    "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
-                    "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
-                    "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
-                    "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
-                    "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
-                    "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
-                    "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
-                    "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
-                    "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
-                    "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
-                    "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
-                    "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
-                    "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
-                    "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
-                    "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
-                    "Updated": formatted_date  # Use the calculated date from one week ago
-               })
+        # Rows are scored as they stream in from the server-side cursor
+        for keyword_data, similarity_ratio in iter_related_rows(sanitized_keyword, stream_keyword_table(table_name)):
+            filtered_related_data.append({
+                "Keyword": keyword_data[0],  # Replace with appropriate column index
+                "Avg. monthly searches": keyword_data[1],  # Replace with appropriate column index
+                "Competition": keyword_data[2],  # Replace with appropriate column index
+                "Competition (indexed value)": keyword_data[3],  # Replace with appropriate column index
+                "Top of page bid (low range)": keyword_data[4],  # Replace with appropriate column index
+                "Top of page bid (high range)": keyword_data[5],  # Replace with appropriate column index
+                "Searches: Sep 2022": keyword_data[6],  # Replace with appropriate column index
+                "Searches: Oct 2022": keyword_data[7],  # Replace with appropriate column index
+                "Searches: Nov 2022": keyword_data[8],  # Replace with appropriate column index
+                "Searches: Dec 2022": keyword_data[9],  # Replace with appropriate column index
+                "Searches: Jan 2023": keyword_data[10],  # Replace with appropriate column index
+                "Searches: Feb 2023": keyword_data[11],  # Replace with appropriate column index
+                "Searches: Mar 2023": keyword_data[12],  # Replace with appropriate column index
+                "Searches: Apr 2023": keyword_data[13],  # Replace with appropriate column index
+                "Searches: May 2023": keyword_data[14],  # Replace with appropriate column index
+                "Searches: Jun 2023": keyword_data[15],  # Replace with appropriate column index
+                "Searches: Jul 2023": keyword_data[16],  # Replace with appropriate column index
+                "Searches: Aug 2023": keyword_data[17],  # Replace with appropriate column index
+                "Updated": formatted_date  # Use the calculated date from one week ago
+           })
 
         if filtered_related_data:
             filtered_related_data.insert(0, {"Total Related Keywords": len(filtered_related_data)})
@@ -875,9 +849,6 @@ def google_keyword_Data():
             if (response_item := next((item for item in response if name in item), None))
         ]
 
-        # Close the database connection
-        cursor.close()
-
         # Return the response
         return jsonify(ordered_response)
 
@@ -0,0 +1,67 @@
+"""Compare building a KeywordStore from rows with mapping it from a corpus file.
+
+Usage: python benchmarks/bench_corpus_file.py [--rows 1000000] [--requests 10]
+
+The store is written with keyword_corpus_file.write_corpus_file() to a
+temporary directory. The benchmark reports the time to build the store from
+rows, the time to open the file, and scoring speed on both stores. It also
+checks that the mapped store returns the same rows and scores.
+"""
+import argparse, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_similarity import make_rows
+from keyword_corpus_file import open_corpus_file, write_corpus_file
+from keyword_store import KeywordStore
+
+
+def measure(store, seeds):
+    started = time.perf_counter()
+    for seed in seeds:
+        store.related_ids(seed)
+    return (time.perf_counter() - started) / len(seeds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    rows = [row + ("120",) * 12 for row in make_rows(args.rows)]
+    rng = random.Random(11)
+    seeds = [rng.choice(rows)[0].strip().lower() for _ in range(args.requests)]
+
+    started = time.perf_counter()
+    store = KeywordStore.from_rows(rows)
+    build_time = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'googlekeywords_bench.corpus')
+        started = time.perf_counter()
+        write_corpus_file(path, store, [len(rows), 0, 0])
+        write_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        mapped, _ = open_corpus_file(path)
+        open_time = time.perf_counter() - started
+
+        for row_id in rng.sample(range(len(rows)), min(len(rows), 10000)):
+            assert mapped.row(row_id) == store.row(row_id), f"row {row_id} differs"
+        for seed in seeds[:3]:
+            expected, got = store.related_ids(seed), mapped.related_ids(seed)
+            assert np.array_equal(expected[0], got[0]) and np.array_equal(expected[1], got[1])
+
+        print(f"corpus:           {len(store)} keywords, {os.path.getsize(path) / 2 ** 20:.1f} MiB on disk")
+        print(f"build from rows:  {build_time:8.2f} s")
+        print(f"write file:       {write_time:8.2f} s")
+        print(f"open file:        {open_time * 1000:8.2f} ms")
+        print(f"score (in memory):{measure(store, seeds) * 1000:8.1f} ms/request")
+        print(f"score (mapped):   {measure(mapped, seeds) * 1000:8.1f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Compare peak RSS of a buffered fetchall() scan and a streamed SSCursor scan in MySQL.
+
+Usage: python benchmarks/bench_mysql_stream.py [--table google_keyword_data_us]
+                                               [--populate 500000] [--keyword "seo tool"]
+
+Connects with the MYSQL_HOST / MYSQL_USER / MYSQL_PASSWORD / MYSQL_DB settings
+used by app1.py. --populate first (re)creates the table with that many
+synthetic rows. Each mode runs in a fresh process so peak RSS is not shared.
+"""
+import argparse, os, random, resource, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+import MySQLdb, MySQLdb.cursors
+
+from keyword_similarity import iter_related_rows
+
+words = ["seo", "tool", "keyword", "best", "free", "research", "google", "ideas",
+         "planner", "rank", "checker", "online", "content", "marketing", "backlink"]
+
+
+def connect():
+    load_dotenv()
+    return MySQLdb.connect(
+        host=os.getenv('MYSQL_HOST', 'localhost'),
+        user=os.getenv('MYSQL_USER', 'root'),
+        passwd=os.getenv('MYSQL_PASSWORD', ''),
+        db=os.getenv('MYSQL_DB', ''),
+        port=int(os.getenv('MYSQL_PORT', 3306)),
+    )
+
+
+def populate(table, count):
+    rng = random.Random(7)
+    connection = connect()
+    cursor = connection.cursor()
+    columns = ", ".join(f"c{i} VARCHAR(512)" for i in range(1, 18))
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} (Keyword VARCHAR(512), {columns})")
+    placeholders = ", ".join(["%s"] * 18)
+    for start in range(0, count, 5000):
+        rows = []
+        for _ in range(min(5000, count - start)):
+            keyword = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+            rows.append((keyword, "1000", "Low", "50", "0.50", "2.00") + ("1000",) * 12)
+        cursor.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    connection.commit()
+    connection.close()
+
+
+def scan(mode, table, keyword, batch_size):
+    connection = connect()
+    started = time.perf_counter()
+    if mode == 'fetchall':
+        # What the handlers did before: buffer the whole table, then score it
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT * FROM {table}")
+        rows = cursor.fetchall()
+    else:
+        cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+        cursor.execute(f"SELECT * FROM {table}")
+
+        def batches():
+            while True:
+                chunk = cursor.fetchmany(batch_size)
+                if not chunk:
+                    return
+                yield from chunk
+
+        rows = batches()
+    related = sum(1 for _ in iter_related_rows(keyword, rows))
+    elapsed = time.perf_counter() - started
+    cursor.close()
+    connection.close()
+
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10} peak RSS {peak:8.1f} MB   {elapsed:6.2f} s   {related} related rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default='google_keyword_data_us')
+    parser.add_argument('--populate', type=int, default=0)
+    parser.add_argument('--keyword', default='seo tool')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--mode', choices=['fetchall', 'stream'])
+    args = parser.parse_args()
+
+    if args.mode:
+        scan(args.mode, args.table, args.keyword, args.batch_size)
+        return
+
+    if args.populate:
+        populate(args.table, args.populate)
+    for mode in ('fetchall', 'stream'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--table', args.table,
+                        '--keyword', args.keyword, '--batch-size', str(args.batch_size)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Fire concurrent /keyword_overview_Data requests at a running server and report throughput.
+
+Usage:
+    python benchmarks/bench_overview_concurrency.py --stub 9100 [--delay 1.0]
+    python benchmarks/bench_overview_concurrency.py --url http://localhost:8000 \
+        [--concurrency 200] [--requests 1000]
+
+To load-test without any upstream, serve overview_stubs.py, which stubs SERP,
+Google Trends, RapidAPI and PostgreSQL in-process:
+
+    gunicorn -c gunicorn_async.conf.py --chdir benchmarks overview_stubs:app
+    gunicorn --workers 2 --chdir benchmarks overview_stubs:app    # sync, to compare
+
+--stub instead serves a slow stand-in for just the RapidAPI trend history over
+HTTP; start the app with RAPIDAPI_BASE_URL=http://localhost:9100. Every
+request uses a new keyword, so none are answered from the cache.
+"""
+import argparse, json, random, statistics, string, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class SlowTrendHistory(BaseHTTPRequestHandler):
+    delay = 1.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps([
+            {'Month_Date_Year': f'{month:02d}-01-2023', 'Search_Count': random.randint(100, 1000)}
+            for month in range(1, 13)
+        ]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_stub(port, delay):
+    SlowTrendHistory.delay = delay
+    print(f"Stub RapidAPI on http://localhost:{port} answering after {delay} s")
+    ThreadingHTTPServer(('', port), SlowTrendHistory).serve_forever()
+
+
+def fetch(session, url, keyword, country):
+    started = time.perf_counter()
+    try:
+        response = session.get(url, params={'keyword': keyword, 'country': country}, timeout=120)
+        ok = response.status_code == 200 and isinstance(response.json(), list)
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def run_load(url, concurrency, count, country):
+    endpoint = url.rstrip('/') + '/keyword_overview_Data'
+    # Distinct keywords so single-flight and the cache cannot merge requests
+    keywords = [''.join(random.choice(string.ascii_lowercase) for _ in range(8)) for _ in range(count)]
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda keyword: fetch(session, endpoint, keyword, country), keywords))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for ok, latency in results)
+    failures = sum(1 for ok, _ in results if not ok)
+    print(f"requests:     {count} ({failures} failed) with {concurrency} in flight")
+    print(f"throughput:   {count / elapsed:.1f} requests/s")
+    print(f"latency p50:  {statistics.median(latencies):.2f} s")
+    print(f"latency p95:  {latencies[int(len(latencies) * 0.95) - 1]:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--country', default='us')
+    parser.add_argument('--stub', type=int, metavar='PORT', help="serve the slow RapidAPI stand-in instead")
+    parser.add_argument('--delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.stub:
+        run_stub(args.stub, args.delay)
+    else:
+        run_load(args.url, args.concurrency, args.requests, args.country)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
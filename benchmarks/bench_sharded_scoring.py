@@ -0,0 +1,69 @@
+"""Compare single-core and sharded multiprocess scoring of one seed against a large corpus.
+
+Usage: python benchmarks/bench_sharded_scoring.py [--rows 1000000] [--requests 10]
+                                                  [--shards 1 2 3 4]
+
+Prints one line per shard count (1..the usable cores by default) with the
+speedup over inline scoring. Shard counts above the usable cores only
+measure the pool overhead.
+"""
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_similarity import make_rows
+from keyword_shards import ShardedScorer
+from keyword_store import KeywordStore
+
+
+def measure(score, seeds):
+    started = time.perf_counter()
+    for seed in seeds:
+        score(seed)
+    return (time.perf_counter() - started) / len(seeds)
+
+
+def usable_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--shards', type=int, nargs='+')
+    args = parser.parse_args()
+    cores = usable_cores()
+    shard_counts = sorted(set(args.shards or range(1, cores + 1)))
+
+    rows = [row + ("0",) * 12 for row in make_rows(args.rows)]
+    store = KeywordStore.from_rows(rows)
+    rng = random.Random(11)
+    seeds = [rng.choice(rows)[0].strip().lower() for _ in range(args.requests)]
+
+    single = measure(store.related_ids, seeds)
+    print(f"cores:     {cores} usable of {os.cpu_count()}")
+    print(f"corpus:    {len(store)} keywords")
+    print(f"inline:    {single * 1000:8.1f} ms/request")
+
+    for shards in shard_counts:
+        scorer = ShardedScorer(shards, min_window=0)
+        shared = scorer.publish(store)
+        try:
+            # The first call starts the pool and attaches the block
+            expected, _ = store.related_ids(seeds[0])
+            got, _ = scorer.related_ids(store, shared, seeds[0])
+            assert np.array_equal(expected, got), "sharded results differ from single-core results"
+            elapsed = measure(lambda seed: scorer.related_ids(store, shared, seed), seeds)
+        finally:
+            scorer.get_pool().shutdown()
+            shared.release()
+        print(f"{shards:2d} shards: {elapsed * 1000:8.1f} ms/request ({single / elapsed:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
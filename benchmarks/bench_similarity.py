@@ -0,0 +1,67 @@
+"""Compare CPU time per request for plain difflib scoring and the prefiltered scorer.
+
+Usage: python benchmarks/bench_similarity.py [--rows 2000] [--requests 50]
+"""
+import argparse, difflib, os, random, string, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_similarity import score_related_rows, similarity_threshold
+
+words = ["seo", "tool", "keyword", "best", "free", "research", "google", "ideas",
+         "planner", "rank", "checker", "online", "content", "marketing", "backlink"]
+
+
+def make_rows(count, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        keyword = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+        if rng.random() < 0.3:
+            chars = list(keyword)
+            chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+            keyword = "".join(chars)
+        rows.append((keyword, "1000", "50", "0.50", "2.00"))
+    return rows
+
+
+def score_naive(sanitized_keyword, rows):
+    # What the handlers did before: one full ratio per row, twice for related rows
+    related = []
+    for row in rows:
+        ratio = difflib.SequenceMatcher(None, sanitized_keyword, row[0].strip().lower()).ratio()
+        if ratio >= similarity_threshold:
+            related.append(row)
+    for row in related:
+        difflib.SequenceMatcher(None, sanitized_keyword, row[0].strip().lower()).ratio()
+    return related
+
+
+def measure(func, seeds, rows):
+    started = time.process_time()
+    for seed in seeds:
+        func(seed, rows)
+    return (time.process_time() - started) / len(seeds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    rng = random.Random(11)
+    seeds = [rng.choice(rows)[0] for _ in range(args.requests)]
+
+    naive = measure(score_naive, seeds, rows)
+    prefiltered = measure(score_related_rows, seeds, rows)
+
+    print(f"rows per request:      {args.rows}")
+    print(f"difflib only:          {naive * 1000:.2f} ms CPU/request")
+    print(f"prefiltered:           {prefiltered * 1000:.2f} ms CPU/request")
+    print(f"CPU saved per request: {(naive - prefiltered) * 1000:.2f} ms ({(1 - prefiltered / naive) * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
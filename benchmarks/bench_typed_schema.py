@@ -0,0 +1,94 @@
+"""Compare size and scan speed of a VARCHAR keyword table and its typed copy in PostgreSQL.
+
+Usage: python benchmarks/bench_typed_schema.py --country us [--repeat 5]
+
+Run it after keyword_migrate.py, which keeps the old table as
+<table>_varchar (or, with --dry-run, builds the typed copy as <table>_typed).
+Both tables are read with a volume filter that needs a cast per row on the
+VARCHAR table and none on the typed one. Connection settings come from the
+same POSTGRES_* environment variables app.py uses.
+"""
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+import psycopg2
+
+from keyword_migrate import Dialect, integer_pattern, integer_type
+
+postgres = Dialect('postgres')
+
+
+def table_exists(cursor, table_name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table_name,))
+    return cursor.fetchone()[0]
+
+
+def table_size(cursor, table_name):
+    cursor.execute(
+        f"SELECT pg_total_relation_size('{table_name}'), pg_relation_size('{table_name}'), "
+        f"(SELECT avg(pg_column_size(t.*)) FROM {table_name} t)"
+    )
+    return cursor.fetchone()
+
+
+def best_time(cursor, query, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(query)
+        result = cursor.fetchone()[0]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--country', required=True)
+    parser.add_argument('--min-volume', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    table_name = f'googlekeywords_data_{args.country.strip().lower()}'
+    connection = psycopg2.connect(
+        host=os.environ.get('POSTGRES_HOST'),
+        user=os.environ.get('POSTGRES_USER'),
+        password=os.environ.get('POSTGRES_PASSWORD'),
+        database=os.environ.get('POSTGRES_DB'),
+        port=os.environ.get('POSTGRES_PORT'),
+    )
+    cursor = connection.cursor()
+
+    if table_exists(cursor, f'{table_name}_typed'):
+        before, after = table_name, f'{table_name}_typed'
+    else:
+        before, after = f'{table_name}_varchar', table_name
+    if not table_exists(cursor, before):
+        sys.exit(f"Neither {table_name}_typed nor {table_name}_varchar exists; run keyword_migrate.py first")
+
+    volume = 'Avg. monthly searches'
+    queries = {
+        before: f'SELECT count(*) FROM {before} '
+                f'WHERE {postgres.converted(volume, integer_type, integer_pattern)} >= {args.min_volume}',
+        after: f'SELECT count(*) FROM {after} WHERE {postgres.column(volume)} >= {args.min_volume}',
+    }
+
+    results = {}
+    for name in (before, after):
+        total, heap, row_width = table_size(cursor, name)
+        elapsed, matches = best_time(cursor, queries[name], args.repeat)
+        results[name] = (total, elapsed)
+        print(f"{name:<40} total {total / 1048576:8.1f} MB   heap {heap / 1048576:8.1f} MB   "
+              f"row {float(row_width or 0):6.1f} B   scan {elapsed * 1000:8.1f} ms   {matches} rows")
+
+    (size_before, time_before), (size_after, time_after) = results[before], results[after]
+    print(f"size:  {(1 - size_after / size_before) * 100:.0f}% smaller")
+    print(f"scan:  {time_before / time_after:.1f}x faster")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""app.py with slow stand-ins for SERP, Google Trends, RapidAPI and PostgreSQL.
+
+Usage: gunicorn -c gunicorn_async.conf.py --chdir benchmarks overview_stubs:app
+
+Every upstream answers after STUB_DELAY seconds (STUB_DATABASE_DELAY for the
+database) with data shaped like the real thing, so the overview endpoints
+return their usual JSON without network access or a database. The stubs
+sleep with time.sleep, which gevent patches, so they behave like network
+waits in the cooperative serving mode. Related keywords are still scored by
+the app's own code against STUB_ROWS synthetic candidates. With
+RAPIDAPI_BASE_URL set, the trend history is fetched from that server instead
+(see bench_overview_concurrency.py --stub).
+"""
+import os, random, sys, time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Stubs do not need rate limiting, precomputed neighbors or the corpus loader
+os.environ.setdefault('TRENDS_RATE_LIMIT', '100000')
+os.environ.setdefault('SERP_RATE_LIMIT', '100000')
+os.environ.setdefault('RAPIDAPI_RATE_LIMIT', '100000')
+os.environ.setdefault('KEYWORD_CORPUS_ENABLED', '0')
+os.environ.setdefault('KEYWORD_NEIGHBORS_ENABLED', '0')
+
+import app as keyword_app
+
+app = keyword_app.app
+
+delay = float(os.environ.get('STUB_DELAY', 0.5))
+database_delay = float(os.environ.get('STUB_DATABASE_DELAY', 0.05))
+candidate_count = int(os.environ.get('STUB_ROWS', 2000))
+regions = ['United States', 'United Kingdom', 'Canada', 'India', 'Australia']
+
+
+class SearchResult:
+    def __init__(self, position):
+        self.link = f'https://example{position}.com/page'
+        self.title = f'Result {position}'
+
+
+class StubGoogle:
+    @staticmethod
+    def search(query, num=10):
+        time.sleep(delay)
+        return [SearchResult(position) for position in range(int(num))]
+
+
+class StubFrame:
+    # The part of a pandas DataFrame the app reads
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iterrows(self):
+        return enumerate(self.rows)
+
+
+class StubTrendReq:
+    def build_payload(self, kw_list):
+        time.sleep(delay)
+        self.kw_list = kw_list
+
+    def related_queries(self):
+        time.sleep(delay)
+        return {
+            keyword: {
+                'top': StubFrame([{'query': f'{keyword} {n}', 'value': 100 - n} for n in range(5)]),
+                'rising': StubFrame([{'query': f'new {keyword} {n}', 'value': 500 * (n + 1)} for n in range(3)]),
+            }
+            for keyword in self.kw_list
+        }
+
+    def interest_by_region(self, resolution='COUNTRY', inc_geo_code=False):
+        time.sleep(delay)
+        return {keyword: {region: 100 - 15 * n for n, region in enumerate(regions)} for keyword in self.kw_list}
+
+
+def stub_trend_history(keyword):
+    time.sleep(delay)
+    return [{'Month_Date_Year': f'{month:02d}-01-2023', 'Search_Count': 1000 + month} for month in range(1, 13)]
+
+
+def stub_row(keyword):
+    # Same column layout as googlekeywords_data_<cc>
+    return (keyword, 1000, 50, 0.5, 2.0) + (1000,) * 12
+
+
+def candidate_rows(sanitized_keyword):
+    # Close variants of the seed (which reach the threshold) among unrelated keywords
+    rng = random.Random(sanitized_keyword)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    rows = [stub_row(sanitized_keyword)]
+    for n in range(1, candidate_count):
+        if n % 10 == 0:
+            keyword = sanitized_keyword + rng.choice(letters)
+        else:
+            keyword = ''.join(rng.choice(letters) for _ in range(len(sanitized_keyword)))
+        rows.append(stub_row(keyword))
+    return rows
+
+
+@contextmanager
+def stub_postgres_cursor(name=None):
+    # Stands in for borrowing a pooled connection
+    yield object()
+
+
+def stub_fetch_candidate_rows(cursor, table_name, sanitized_keyword):
+    time.sleep(database_delay)
+    return candidate_rows(sanitized_keyword)
+
+
+def stub_fetch_exact_match_row(sanitized_keyword, sanitized_country):
+    time.sleep(database_delay)
+    return stub_row(sanitized_keyword)
+
+
+keyword_app.Google = StubGoogle
+keyword_app.trends_clients.factory = lambda geo: StubTrendReq()
+if not os.environ.get('RAPIDAPI_BASE_URL'):
+    keyword_app.rapidapi_client.get_json = stub_trend_history
+keyword_app.postgres_cursor = stub_postgres_cursor
+keyword_app.fetch_candidate_rows = stub_fetch_candidate_rows
+keyword_app.fetch_exact_match_row = stub_fetch_exact_match_row
@@ -0,0 +1,36 @@
+# Cooperative (gevent) serving mode for the upstream-heavy overview endpoints:
+#
+#   gunicorn -c gunicorn_async.conf.py app:app
+#
+# An overview request spends nearly all its time waiting on SERP, Google
+# Trends, RapidAPI and PostgreSQL. With gevent workers every request is a
+# greenlet and the blocking clients app.py already uses (requests, pytrends,
+# googlesearcher, psycopg2 via psycogreen) yield while they wait, so a few
+# processes hold hundreds of requests in flight with the same handlers and
+# the same JSON responses. Only meant for app.py: the MySQL driver used by
+# app1.py is not cooperative.
+#
+# For load tests, serve the app with every upstream stubbed out:
+#
+#   gunicorn -c gunicorn_async.conf.py --chdir benchmarks overview_stubs:app
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gevent'
+# Requests in flight per worker
+worker_connections = int(os.environ.get('ASYNC_WORKER_CONNECTIONS', 500))
+timeout = int(os.environ.get('ASYNC_WORKER_TIMEOUT', 60))
+
+# The upstream fan-out pool runs greenlets here, so it can be much larger
+# than in a sync worker. Set before app.py is imported.
+os.environ.setdefault('UPSTREAM_MAX_WORKERS', str(worker_connections * 4))
+# Related-keyword scoring is CPU-bound; run it on real threads so it does not
+# block the other greenlets
+os.environ.setdefault('SCORING_OFFLOAD', 'gevent')
+
+
+def post_fork(server, worker):
+    # Let psycopg2 wait on the gevent hub instead of blocking the process
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
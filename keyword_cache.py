@@ -0,0 +1,214 @@
+import os, pickle, sqlite3, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class SQLiteCacheBackend:
+    """Cache entries in a local SQLite file shared by every gunicorn worker.
+
+    Each process (and thread) opens its own connection; SQLite's WAL mode
+    lets the workers read concurrently while one of them writes.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, fresh_until REAL, "
+                "expires_at REAL, accessed_at REAL)"
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        # Returns (payload, fresh_until, expires_at) or None
+        connection = self.connection()
+        row = connection.execute(
+            "SELECT value, fresh_until, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            connection.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def set(self, key, payload, fresh_until, expires_at):
+        # Returns the number of entries evicted to stay under max_bytes
+        connection = self.connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+            (key, payload, len(payload), fresh_until, expires_at, time.time())
+        )
+        connection.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+
+        evicted = 0
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = connection.execute(
+                "SELECT key, size FROM cache_entries ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            connection.execute("DELETE FROM cache_entries WHERE key = ?", (oldest[0],))
+            total -= oldest[1]
+            evicted += 1
+        return evicted
+
+
+class KeywordCache:
+    """Thread-safe cache with per-source TTLs and a byte budget.
+
+    Entries are keyed by ``(source, key)`` and are fresh for the TTL configured
+    for their source. Sources with a stale TTL keep serving the entry for that
+    much longer through ``lookup()``, which flags it as stale so the caller can
+    revalidate it in the background. When the pickled size of all entries
+    goes over ``max_bytes`` the least recently used ones are evicted. With a
+    shared backend, a local miss falls through to the backend so all workers
+    share hits; the local copy then serves repeat reads without touching disk.
+    """
+
+    def __init__(self, ttls, default_ttl=3600, max_bytes=64 * 1024 * 1024, backend=None, stale_ttls=None):
+        self.ttls = ttls
+        self.stale_ttls = stale_ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+        self.counters = {'hits': 0, 'backend_hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def ttl(self, source):
+        return self.ttls.get(source, self.default_ttl)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, source, key):
+        # Returns the cached value, or None on a miss or when it is not fresh
+        value, stale = self.lookup(source, key)
+        return None if stale else value
+
+    def lookup(self, source, key):
+        # Returns (value, stale). A stale value is past its TTL but still
+        # inside the source's stale window; (None, False) is a miss.
+        cache_key = f"{source}:{key}"
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is not None:
+                value, size, fresh_until, expires_at = entry
+                if expires_at > now:
+                    self.entries.move_to_end(cache_key)
+                    stale = fresh_until <= now
+                    self.counters['stale_hits' if stale else 'hits'] += 1
+                    return value, stale
+                self.discard(cache_key)
+                self.counters['expirations'] += 1
+
+        if self.backend is not None:
+            try:
+                stored = self.backend.get(cache_key)
+            except Exception as e:
+                print(f"Cache backend read failed: {str(e)}")
+                stored = None
+            if stored is not None and stored[2] > now:
+                value = pickle.loads(stored[0])
+                self.store_locally(cache_key, value, len(stored[0]), stored[1], stored[2])
+                self.count('backend_hits')
+                return value, stored[1] <= now
+
+        self.count('misses')
+        return None, False
+
+    def set(self, source, key, value):
+        cache_key = f"{source}:{key}"
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        fresh_until = time.time() + self.ttl(source)
+        expires_at = fresh_until + self.stale_ttls.get(source, 0)
+        self.store_locally(cache_key, value, len(payload), fresh_until, expires_at)
+
+        if self.backend is not None:
+            try:
+                self.count('evictions', self.backend.set(cache_key, payload, fresh_until, expires_at))
+            except Exception as e:
+                print(f"Cache backend write failed: {str(e)}")
+
+    def store_locally(self, cache_key, value, size, fresh_until, expires_at):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.discard(cache_key)
+            self.entries[cache_key] = (value, size, fresh_until, expires_at)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self.discard(oldest)
+                self.counters['evictions'] += 1
+
+    def discard(self, cache_key):
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def stats(self):
+        with self.lock:
+            hits = self.counters['hits'] + self.counters['backend_hits'] + self.counters['stale_hits']
+            requests = hits + self.counters['misses']
+            return dict(
+                self.counters,
+                entries=len(self.entries),
+                bytes=self.total_bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=round(hits / requests, 4) if requests else None,
+                shared_backend=self.backend.path if self.backend is not None else None,
+            )
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single call.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = func()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stats(self):
+        with self.lock:
+            return {'in_flight': len(self.calls), 'coalesced': self.coalesced}
@@ -0,0 +1,138 @@
+import os, threading, time
+
+from keyword_store import KeywordStore
+
+
+class CorpusSnapshot:
+    """Immutable in-memory copy of one country's keyword table."""
+
+    def __init__(self, store, version, scorer=None):
+        self.store = store
+        self.version = version
+        self.loaded_at = time.time()
+        # With a ShardedScorer the keywords are also published to shared memory
+        self.scorer = scorer
+        self.shared = scorer.publish(self.store) if scorer is not None else None
+
+    def release(self):
+        if self.shared is not None:
+            self.shared.release()
+
+    def __len__(self):
+        return len(self.store)
+
+    def related_rows(self, sanitized_keyword, ranking=None):
+        # Returns (row, score) pairs for every keyword reaching the threshold.
+        # `ranking` holds KeywordStore.rank() arguments; rows are only built
+        # for the ones that survive it.
+        if self.scorer is not None:
+            row_ids, scores = self.scorer.related_ids(self.store, self.shared, sanitized_keyword)
+        else:
+            row_ids, scores = self.store.related_ids(sanitized_keyword)
+        if ranking:
+            row_ids, scores = self.store.rank(row_ids, scores, **ranking)
+        return [(self.store.row(row_id), score) for row_id, score in zip(row_ids.tolist(), scores.tolist())]
+
+    def exact_row(self, sanitized_keyword):
+        # Returns the row whose normalized keyword equals sanitized_keyword,
+        # or None. Only keywords of the same length are compared.
+        length = len(sanitized_keyword)
+        matches = [
+            row_id for row_id in self.store.ids_with_length(length, length).tolist()
+            if isinstance(self.store.keywords[row_id], str)
+            and self.store.keywords[row_id].strip().lower() == sanitized_keyword
+        ]
+        if not matches:
+            return None
+        # Same tie-break as the database query: the smallest raw keyword
+        return self.store.row(min(matches, key=lambda row_id: self.store.keywords[row_id]))
+
+
+class KeywordCorpus:
+    """Per-process snapshots of the country keyword tables.
+
+    ``load_rows(country)`` returns every row of a country table and
+    ``load_version(country)`` returns a cheap value that changes whenever the
+    table does. A background thread polls the versions every
+    ``refresh_interval`` seconds and swaps in a fresh snapshot when one moved;
+    readers keep using the old snapshot until the new one is fully built.
+    When ``load_store(country)`` is given it is used instead of
+    ``load_rows`` and returns a ready ``(KeywordStore, version)`` pair, e.g.
+    one mapped from a corpus file.
+    """
+
+    def __init__(self, load_rows, load_version, refresh_interval=300, scorer=None, load_store=None):
+        self.load_rows = load_rows
+        self.load_version = load_version
+        self.load_store = load_store
+        self.refresh_interval = refresh_interval
+        self.scorer = scorer
+        self.snapshots = {}
+        self.loading = set()
+        self.lock = threading.Lock()
+        self.refresher_pid = None
+
+    def load(self, country):
+        # Read the version first so a change made during the load is picked
+        # up by the next refresh instead of being missed
+        if self.load_store is not None:
+            store, version = self.load_store(country)
+        else:
+            version = self.load_version(country)
+            store = KeywordStore.from_rows(self.load_rows(country))
+        snapshot = CorpusSnapshot(store, version, self.scorer)
+        previous = self.snapshots.get(country)
+        self.snapshots[country] = snapshot
+        if previous is not None:
+            previous.release()
+        print(f"Loaded {len(snapshot)} keywords for '{country}' into memory")
+        return snapshot
+
+    def get(self, country):
+        # Returns the snapshot for `country`, or None while it is still being
+        # loaded in the background. Callers fall back to the database meanwhile.
+        self.ensure_refresher()
+
+        snapshot = self.snapshots.get(country)
+        if snapshot is not None:
+            return snapshot
+
+        with self.lock:
+            if country in self.loading:
+                return None
+            self.loading.add(country)
+        threading.Thread(target=self.load_in_background, args=(country,), daemon=True).start()
+        return None
+
+    def load_in_background(self, country):
+        try:
+            self.load(country)
+        except Exception as e:
+            print(f"Failed to load keyword corpus for '{country}': {str(e)}")
+        finally:
+            with self.lock:
+                self.loading.discard(country)
+
+    def refresh(self):
+        for country, snapshot in list(self.snapshots.items()):
+            try:
+                if self.load_version(country) != snapshot.version:
+                    self.load(country)
+            except Exception as e:
+                print(f"Failed to refresh keyword corpus for '{country}': {str(e)}")
+
+    def ensure_refresher(self):
+        # Threads do not survive a fork, so every gunicorn worker starts its own
+        if self.refresher_pid == os.getpid():
+            return
+        with self.lock:
+            if self.refresher_pid == os.getpid():
+                return
+            self.loading = set()
+            threading.Thread(target=self.run_refresher, daemon=True).start()
+            self.refresher_pid = os.getpid()
+
+    def run_refresher(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
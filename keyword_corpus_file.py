@@ -0,0 +1,279 @@
+"""Build and map read-only binary keyword corpus files.
+
+Usage: python keyword_corpus_file.py --country us [--country de ...] [--dir corpus]
+
+A corpus file holds one country table in the layout of KeywordStore: the
+raw keywords as one UTF-8 blob with an int64 offset table, every metric
+column as a fixed-width array, the keyword length index and the per-row
+overflow values as JSON. The file starts with a small JSON header:
+
+    KWCORPUS | format (uint32) | header length (uint32) | header JSON
+
+The header records the table version it was built from, when it was built
+and where each section starts. Sections are 8-byte aligned, so app.py
+(KEYWORD_CORPUS_DIR) maps the file and wraps the sections as NumPy arrays
+without copying them.
+Every gunicorn worker then shares one copy in the page cache, and opening a
+file takes milliseconds instead of a full table load.
+
+A rebuild writes a temporary file next to the old one and renames it over
+it. Workers notice the new header version on their next refresh and map the
+new file. Requests still using the old file keep its pages until they finish.
+"""
+import argparse, json, mmap, os, struct, sys, tempfile, time
+
+import numpy as np
+
+from keyword_store import KeywordStore
+
+magic = b'KWCORPUS'
+file_format = 1
+prelude = struct.Struct('<8sII')
+
+
+class MappedKeywords:
+    """Read-only sequence of the keywords stored in a corpus file."""
+
+    def __init__(self, offsets, blob, missing):
+        self.offsets = offsets
+        self.blob = blob
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.missing)
+
+    def __getitem__(self, row_id):
+        if self.missing[row_id]:
+            return None
+        return self.blob[self.offsets[row_id]:self.offsets[row_id + 1]].tobytes().decode('utf-8')
+
+
+class MappedOverflow:
+    """Read-only KeywordStore overflow map stored in a corpus file.
+
+    Each row's values are a JSON list of [column, value] pairs, decoded only
+    when the row is built, so opening the file does not parse them all.
+    """
+
+    def __init__(self, row_ids, offsets, blob):
+        self.row_ids = row_ids
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def get(self, row_id, default=None):
+        index = int(np.searchsorted(self.row_ids, row_id))
+        if index == len(self.row_ids) or self.row_ids[index] != row_id:
+            return default
+        return self.decode(index)
+
+    def decode(self, index):
+        encoded = self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+        return {column: value for column, value in json.loads(encoded)}
+
+    def items(self):
+        for index, row_id in enumerate(self.row_ids.tolist()):
+            yield row_id, self.decode(index)
+
+
+def corpus_path(directory, sanitized_country):
+    return os.path.join(directory, f'googlekeywords_{sanitized_country.lower()}.corpus')
+
+
+def write_corpus_file(path, store, version):
+    # Writes `store` to `path` through a temporary file and a rename, so
+    # readers see the old file or the new one, never a partial file
+    keywords = [store.keywords[row_id] for row_id in range(len(store))]
+    encoded = [keyword.encode('utf-8') if isinstance(keyword, str) else b'' for keyword in keywords]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(keyword) for keyword in encoded], out=offsets[1:])
+
+    overflow = {row_id: dict(extra) for row_id, extra in store.overflow.items()}
+    for row_id, keyword in enumerate(keywords):
+        # The blob only holds strings; anything else comes back through the overflow
+        if keyword is not None and not isinstance(keyword, str):
+            overflow.setdefault(row_id, {})[0] = keyword
+    overflow_rows = sorted(overflow)
+    overflow_encoded = [json.dumps(sorted(overflow[row_id].items())).encode('utf-8') for row_id in overflow_rows]
+    overflow_offsets = np.zeros(len(overflow_encoded) + 1, dtype=np.int64)
+    np.cumsum([len(extra) for extra in overflow_encoded], out=overflow_offsets[1:])
+
+    sections = [
+        ('keyword_offsets', offsets),
+        ('keyword_missing', np.array([not isinstance(keyword, str) for keyword in keywords], dtype=np.bool_)),
+        ('keyword_blob', np.frombuffer(b''.join(encoded), dtype=np.uint8)),
+        ('volume', store.volume),
+        ('competition', store.competition),
+        ('bid_low', store.bid_low),
+        ('bid_high', store.bid_high),
+        ('monthly', store.monthly),
+        ('lengths', store.lengths),
+        ('length_order', store.length_order),
+        ('length_offsets', np.asarray(store.length_offsets, dtype=np.int64)),
+        ('overflow_rows', np.array(overflow_rows, dtype=np.int64)),
+        ('overflow_offsets', overflow_offsets),
+        ('overflow_blob', np.frombuffer(b''.join(overflow_encoded), dtype=np.uint8)),
+    ]
+
+    header = {
+        'version': version,
+        'built_at': time.time(),
+        'rows': len(store),
+        'width': store.width,
+        'typed': sorted(store.typed),
+        'decimals': {str(column): places for column, places in store.decimals.items()},
+        'sections': {},
+    }
+    # Section offsets depend on the header length, so lay them out against a
+    # generous estimate of it and pad the header up to that size
+    header_size = 4096 + 128 * len(sections)
+    position = prelude.size + header_size
+    for name, values in sections:
+        position = -(-position // 8) * 8
+        header['sections'][name] = [position, values.dtype.str, list(values.shape)]
+        position += values.nbytes
+    encoded_header = json.dumps(header).encode('utf-8')
+    if len(encoded_header) > header_size:
+        raise ValueError("The corpus header is too large.")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(prefix='.corpus-', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(prelude.pack(magic, file_format, len(encoded_header)))
+            output.write(encoded_header.ljust(header_size, b' '))
+            for name, values in sections:
+                output.seek(header['sections'][name][0])
+                output.write(np.ascontiguousarray(values).tobytes())
+            output.flush()
+            os.fsync(output.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except Exception:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return header
+
+
+def read_header(source):
+    # `source` is an open binary file or a mapping of the whole file
+    head = source[:prelude.size] if isinstance(source, mmap.mmap) else source.read(prelude.size)
+    if len(head) < prelude.size:
+        raise ValueError("Not a keyword corpus file.")
+    file_magic, version, header_length = prelude.unpack(head)
+    if file_magic != magic:
+        raise ValueError("Not a keyword corpus file.")
+    if version != file_format:
+        raise ValueError(f"Unsupported keyword corpus format {version}.")
+    if isinstance(source, mmap.mmap):
+        return json.loads(source[prelude.size:prelude.size + header_length])
+    return json.loads(source.read(header_length))
+
+
+def header_version(header):
+    # A rebuild counts as a change even when the table counters did not move
+    return (tuple(header['version'] or ()), header['built_at'])
+
+
+def read_corpus_version(path):
+    # Reads only the header; cheap enough for every refresh
+    with open(path, 'rb') as corpus_file:
+        return header_version(read_header(corpus_file))
+
+
+def open_corpus_file(path):
+    # Returns (KeywordStore, version) backed by a read-only mapping of `path`.
+    # The mapping stays open for as long as the store is referenced, even
+    # after the file is replaced.
+    with open(path, 'rb') as corpus_file:
+        mapping = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(mapping)
+
+    sections = {}
+    for name, (offset, dtype, shape) in header['sections'].items():
+        count = int(np.prod(shape, dtype=np.int64))
+        sections[name] = np.frombuffer(mapping, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+
+    overflow = MappedOverflow(
+        sections['overflow_rows'], sections['overflow_offsets'], memoryview(sections['overflow_blob'])
+    )
+    keywords = MappedKeywords(
+        sections['keyword_offsets'], memoryview(sections['keyword_blob']), sections['keyword_missing']
+    )
+    store = KeywordStore(
+        keywords, sections['volume'], sections['competition'], sections['bid_low'], sections['bid_high'],
+        sections['monthly'], overflow, header['width'], frozenset(header['typed']),
+        lengths=sections['lengths'], length_order=sections['length_order'],
+        length_offsets=sections['length_offsets'],
+        decimals={int(column): places for column, places in header.get('decimals', {}).items()},
+    )
+    return store, header_version(header)
+
+
+def connect():
+    import psycopg2
+    return psycopg2.connect(
+        host=os.environ.get('POSTGRES_HOST'),
+        user=os.environ.get('POSTGRES_USER'),
+        password=os.environ.get('POSTGRES_PASSWORD'),
+        database=os.environ.get('POSTGRES_DB'),
+        port=os.environ.get('POSTGRES_PORT'),
+    )
+
+
+def table_version(connection, table_name):
+    # Same OID and counters app.py compares to decide whether a table changed
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relid, n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables WHERE relname = %s",
+            (table_name,)
+        )
+        row = cursor.fetchone()
+        return list(row) if row is not None else None
+
+
+def build_corpus_file(connection, sanitized_country, directory):
+    table_name = f'googlekeywords_data_{sanitized_country}'
+    # Read the version first so a change made during the build is picked up
+    # by the next one instead of being missed
+    version = table_version(connection, table_name)
+    with connection.cursor(name=f'corpus_{table_name}') as cursor:
+        cursor.itersize = 10000
+        cursor.execute(f'SELECT * FROM {table_name}')
+        store = KeywordStore.from_rows(cursor)
+    connection.commit()
+
+    path = corpus_path(directory, sanitized_country)
+    write_corpus_file(path, store, version)
+    return path, len(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--country', action='append', required=True)
+    parser.add_argument('--dir', default=os.environ.get('KEYWORD_CORPUS_DIR', 'corpus'))
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    countries = [country.strip().lower() for country in args.country]
+    if not all(country.isalpha() for country in countries):
+        parser.error("Invalid country code.")
+    os.makedirs(args.dir, exist_ok=True)
+
+    connection = connect()
+    try:
+        for country in countries:
+            started = time.time()
+            path, count = build_corpus_file(connection, country, args.dir)
+            print(f"Wrote {count} keywords to {path} ({os.path.getsize(path)} bytes) "
+                  f"in {time.time() - started:.1f} seconds")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
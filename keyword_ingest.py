@@ -0,0 +1,273 @@
+"""Bulk-load Keyword Planner CSV exports into a country keyword table.
+
+Usage: python keyword_ingest.py export.csv [export2.csv ...] --country us
+                                [--mysql [--load-data]] [--batch-size 5000]
+
+Rows are streamed from the exports (UTF-16 tab-separated or UTF-8 CSV, as
+Keyword Planner writes them), numeric columns are parsed ("1,000" -> 1000,
+blanks -> NULL) and keywords are deduplicated on their normalized form, first
+occurrence wins. Everything is loaded into a staging table, with COPY for
+PostgreSQL (app.py) and LOAD DATA or batched inserts for MySQL (app1.py), and
+then swapped in with a single rename so readers never see a partial table.
+
+The target table must already exist; its column names decide which export
+columns are loaded. Connection settings come from the same environment
+variables the apps use.
+"""
+import argparse, csv, os, sys, tempfile, time
+
+from dotenv import load_dotenv
+
+from keyword_migrate import create_trigram_extension
+from keyword_store import parse_float, parse_int
+
+# Columns kept as text; every other column is parsed as a number
+text_columns = {'keyword', 'competition', 'currency'}
+bid_columns = {'top of page bid (low range)', 'top of page bid (high range)'}
+
+
+def open_export(path):
+    # Keyword Planner writes UTF-16 with a BOM; other tools write UTF-8
+    with open(path, 'rb') as export_file:
+        head = export_file.read(4)
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        encoding = 'utf-16'
+    else:
+        encoding = 'utf-8-sig'
+    return open(path, encoding=encoding, newline='')
+
+
+def read_export(path):
+    # Yields the header row, then every data row. The title and date-range
+    # lines Keyword Planner puts above the header are skipped.
+    with open_export(path) as export_file:
+        for line in export_file:
+            delimiter = '\t' if '\t' in line else ','
+            header = next(csv.reader([line], delimiter=delimiter), [])
+            if header and header[0].strip().lower() == 'keyword':
+                break
+        else:
+            raise ValueError(f"{path}: no header row starting with 'Keyword' found")
+
+        yield header
+        yield from csv.reader(export_file, delimiter=delimiter)
+
+
+def map_columns(table_columns, header):
+    # Returns, for every table column, the index of the export column that
+    # feeds it (or None). "Searches: <Mon YYYY>" columns that are not found by
+    # name are matched by position, so a newer export still fills the series.
+    positions = {name.strip().lower(): index for index, name in enumerate(header)}
+    mapping = [positions.get(column.strip().lower()) for column in table_columns]
+
+    table_months = [i for i, column in enumerate(table_columns) if column.lower().startswith('searches:')]
+    export_months = [i for i, name in enumerate(header) if name.strip().lower().startswith('searches:')]
+    if any(mapping[i] is None for i in table_months) and len(table_months) == len(export_months):
+        print(f"Loading monthly searches by position: {header[export_months[0]]} .. {header[export_months[-1]]}")
+        for table_index, export_index in zip(table_months, export_months):
+            mapping[table_index] = export_index
+
+    missing = [column for column, index in zip(table_columns, mapping) if index is None]
+    if missing:
+        print(f"Not in the export, loaded as NULL: {', '.join(missing)}")
+    return mapping
+
+
+def convert(column, raw):
+    if raw is None:
+        return None
+    raw = raw.strip()
+    name = column.strip().lower()
+    if name in text_columns:
+        return raw or None
+    if name in bid_columns:
+        return parse_float(raw)
+    return parse_int(raw)
+
+
+def export_rows(paths, table_columns, stats):
+    # Yields typed, deduplicated rows in table column order
+    seen = set()
+    for path in paths:
+        rows = read_export(path)
+        mapping = map_columns(table_columns, next(rows))
+        keyword_index = mapping[0]
+        if keyword_index is None:
+            raise ValueError(f"{path}: no Keyword column")
+
+        for row in rows:
+            stats['read'] += 1
+            if keyword_index >= len(row) or not row[keyword_index].strip():
+                stats['skipped'] += 1
+                continue
+            normalized = row[keyword_index].strip().lower()
+            if normalized in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(normalized)
+            stats['loaded'] += 1
+            yield tuple(
+                convert(column, row[index] if index is not None and index < len(row) else None)
+                for column, index in zip(table_columns, mapping)
+            )
+
+
+def spool_rows(rows, null=''):
+    # Writes rows to a temporary CSV file so the database reads them in one
+    # stream while memory stays flat
+    spool = tempfile.NamedTemporaryFile(mode='w+', newline='', suffix='.csv')
+    writer = csv.writer(spool, lineterminator='\n')
+    for row in rows:
+        writer.writerow([null if value is None else value for value in row])
+    spool.seek(0)
+    return spool
+
+
+def load_postgres(table_name, paths, stats):
+    import psycopg2
+
+    connection = psycopg2.connect(
+        host=os.environ.get('POSTGRES_HOST'),
+        user=os.environ.get('POSTGRES_USER'),
+        password=os.environ.get('POSTGRES_PASSWORD'),
+        database=os.environ.get('POSTGRES_DB'),
+        port=os.environ.get('POSTGRES_PORT'),
+    )
+    staging = f'{table_name}_staging'
+    create_trigram_extension(connection)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT * FROM {table_name} LIMIT 0')
+            columns = [description[0] for description in cursor.description]
+            column_list = ', '.join(f'"{column}"' for column in columns)
+
+            # Blank CSV fields load as NULL in every column type
+            cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+            cursor.execute(f'CREATE TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS)')
+            with spool_rows(export_rows(paths, columns, stats)) as spool:
+                cursor.copy_expert(f'COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)', spool)
+
+            # Build the indexes the app relies on before the table goes live
+            cursor.execute(
+                f'CREATE INDEX {staging}_keyword_lower_idx ON {staging} (lower(trim("Keyword")))'
+            )
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            trigram = cursor.fetchone() is not None
+            if trigram:
+                cursor.execute(
+                    f'CREATE INDEX {staging}_keyword_trgm_idx '
+                    f'ON {staging} USING gin (lower(trim("Keyword")) gin_trgm_ops)'
+                )
+            cursor.execute(f'ANALYZE {staging}')
+            connection.commit()
+
+            # The swap is one transaction: readers see the old table or the new one
+            cursor.execute(f'ALTER TABLE {table_name} RENAME TO {table_name}_old')
+            cursor.execute(f'ALTER TABLE {staging} RENAME TO {table_name}')
+            cursor.execute(f'DROP TABLE {table_name}_old')
+            cursor.execute(f'ALTER INDEX {staging}_keyword_lower_idx RENAME TO {table_name}_keyword_lower_idx')
+            if trigram:
+                cursor.execute(f'ALTER INDEX {staging}_keyword_trgm_idx RENAME TO {table_name}_keyword_trgm_idx')
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def load_mysql(table_name, paths, stats, load_data=False, batch_size=5000):
+    import MySQLdb
+
+    connection = MySQLdb.connect(
+        host=os.getenv('MYSQL_HOST'),
+        user=os.getenv('MYSQL_USER'),
+        passwd=os.getenv('MYSQL_PASSWORD'),
+        db=os.getenv('MYSQL_DB'),
+        port=int(os.getenv('MYSQL_PORT', 3306)),
+        local_infile=1 if load_data else 0,
+    )
+    staging = f'{table_name}_staging'
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f'SELECT * FROM {table_name} LIMIT 0')
+        columns = [description[0] for description in cursor.description]
+        column_list = ', '.join(f'`{column}`' for column in columns)
+
+        # LIKE copies the indexes, including the exact-match one; a live table
+        # without it gets it on the staging copy before the swap
+        cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+        cursor.execute(f'CREATE TABLE {staging} LIKE {table_name}')
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (staging, f'{table_name}_keyword_lower_idx')
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                f'CREATE INDEX {table_name}_keyword_lower_idx ON {staging} ((lower(trim(`Keyword`))))'
+            )
+        rows = export_rows(paths, columns, stats)
+
+        if load_data:
+            # Needs local_infile enabled on the server
+            with spool_rows(rows, null='\\N') as spool:
+                spool.flush()
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} "
+                    "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                    f"LINES TERMINATED BY '\\n' ({column_list})",
+                    (spool.name,)
+                )
+        else:
+            # executemany turns this into multi-row INSERTs
+            query = f"INSERT INTO {staging} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))})"
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    cursor.executemany(query, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(query, batch)
+        connection.commit()
+
+        # RENAME TABLE swaps both names atomically
+        cursor.execute(f'RENAME TABLE {table_name} TO {table_name}_old, {staging} TO {table_name}')
+        cursor.execute(f'DROP TABLE {table_name}_old')
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', metavar='export.csv')
+    parser.add_argument('--country', required=True)
+    parser.add_argument('--mysql', action='store_true', help="load the app1.py MySQL table")
+    parser.add_argument('--load-data', action='store_true', help="use LOAD DATA LOCAL INFILE (MySQL)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows per INSERT batch (MySQL)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    country = args.country.strip().lower()
+    if not country.isalpha():
+        parser.error("Invalid country code.")
+
+    stats = {'read': 0, 'loaded': 0, 'duplicates': 0, 'skipped': 0}
+    started = time.time()
+    if args.mysql:
+        table_name = f'google_keyword_data_{country}'
+        load_mysql(table_name, args.paths, stats, args.load_data, args.batch_size)
+    else:
+        table_name = f'googlekeywords_data_{country}'
+        load_postgres(table_name, args.paths, stats)
+
+    elapsed = time.time() - started
+    print(f"Loaded {stats['loaded']} keywords into {table_name} in {elapsed:.1f} seconds "
+          f"({stats['read']} rows read, {stats['duplicates']} duplicates, {stats['skipped']} without a keyword)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
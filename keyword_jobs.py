@@ -0,0 +1,246 @@
+import ipaddress, json, os, socket, sqlite3, threading, time, uuid
+from urllib.parse import urlparse
+
+import requests
+
+
+class JobQueue:
+    """Job queue in a local SQLite file shared by every gunicorn worker.
+
+    ``submit()`` stores a job and returns its id straight away. Each process
+    runs ``workers`` threads that claim queued jobs (one claim per
+    transaction, so a job runs once across processes), call
+    ``run_job(kind, params)`` and store the ``(result, status_code)`` it
+    returns. Clients poll ``get(job_id)``, or pass a callback URL that the
+    result is POSTed to. Callback URLs must resolve to public addresses
+    only, unless their host is in ``allowed_callback_hosts``; they are
+    checked on submit and again before every delivery. A job whose worker
+    died is queued again once its lease runs out, up to ``max_attempts``
+    times, and finished jobs are deleted after ``result_ttl`` seconds.
+    """
+
+    def __init__(self, path, run_job, workers=2, lease=300, max_attempts=3, result_ttl=3600,
+                 poll_interval=1.0, callback_timeout=10, callback_retries=3, allowed_callback_hosts=()):
+        self.path = path
+        self.run_job = run_job
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        self.callback_retries = callback_retries
+        self.allowed_callback_hosts = {host.lower() for host in allowed_callback_hosts}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.workers_pid = None
+        self.busy = 0
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, result TEXT, "
+                "status_code INTEGER, callback_url TEXT, callback_status TEXT, attempts INTEGER, "
+                "created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at)")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def check_callback_url(self, callback_url):
+        # Raises ValueError unless the URL is http(s) and every address its
+        # host resolves to is public, so the server cannot be made to POST
+        # to loopback, private, link-local (e.g. 169.254.169.254) or
+        # reserved hosts
+        parsed = urlparse(callback_url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ValueError("not an http or https URL")
+        if parsed.hostname.lower() in self.allowed_callback_hosts:
+            return
+
+        try:
+            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+            addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+        except (OSError, ValueError):
+            raise ValueError("host does not resolve")
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])
+            if ip.version == 6 and ip.ipv4_mapped is not None:
+                ip = ip.ipv4_mapped
+            if not ip.is_global or ip.is_multicast:
+                raise ValueError("host is not public")
+
+    def submit(self, kind, params, callback_url=None):
+        if callback_url is not None:
+            self.check_callback_url(callback_url)
+        job_id = uuid.uuid4().hex
+        self.connection().execute(
+            "INSERT INTO jobs (id, kind, params, status, callback_url, attempts, created_at) "
+            "VALUES (?, ?, ?, 'queued', ?, 0, ?)",
+            (job_id, kind, json.dumps(params), callback_url, time.time())
+        )
+        self.ensure_workers()
+        with self.wakeup:
+            self.wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        # Returns the job as a dict, or None when it is unknown or expired
+        self.ensure_workers()
+        row = self.connection().execute(
+            "SELECT id, kind, status, result, status_code, callback_status, attempts, "
+            "created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row[0], 'kind': row[1], 'status': row[2], 'attempts': row[6],
+            'created_at': row[7], 'started_at': row[8], 'finished_at': row[9],
+        }
+        if row[2] in ('done', 'failed'):
+            job['result'] = json.loads(row[3]) if row[3] is not None else None
+            job['status_code'] = row[4]
+        if row[5] is not None:
+            job['callback_status'] = row[5]
+        return job
+
+    def claim(self):
+        # Returns (id, kind, params, callback_url) of the oldest queued job,
+        # now marked as running, or None
+        connection = self.connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose worker died go back to the queue, or fail for good
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, status_code = 500, "
+                "result = '{\"error\": \"The job was interrupted too many times.\"}' "
+                "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (now, now - self.lease, self.max_attempts)
+            )
+            connection.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started_at < ?",
+                (now - self.lease,)
+            )
+            connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - self.result_ttl,)
+            )
+
+            row = connection.execute(
+                "SELECT id, kind, params, callback_url FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (now, row[0])
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]), row[3]
+
+    def finish(self, job_id, result, status_code):
+        status = 'done' if status_code < 500 else 'failed'
+        self.connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, status_code = ?, finished_at = ? WHERE id = ?",
+            (status, json.dumps(result), status_code, time.time(), job_id)
+        )
+
+    def run_next(self):
+        # Runs one queued job; returns False when there was none
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        job_id, kind, params, callback_url = claimed
+
+        with self.lock:
+            self.busy += 1
+        try:
+            try:
+                result, status_code = self.run_job(kind, params)
+            except Exception as e:
+                print(f"Job {job_id} ({kind}) failed: {str(e)}")
+                result, status_code = {'error': str(e)}, 500
+            self.finish(job_id, result, status_code)
+        finally:
+            with self.lock:
+                self.busy -= 1
+
+        if callback_url:
+            self.deliver(job_id, callback_url)
+        return True
+
+    def deliver(self, job_id, callback_url):
+        # POSTs the finished job to its callback URL, retrying with backoff
+        job = self.get(job_id)
+        for attempt in range(self.callback_retries):
+            try:
+                # Checked again right before sending, in case the host now
+                # resolves somewhere else (DNS rebinding). Redirects are not
+                # followed, since they could lead anywhere.
+                self.check_callback_url(callback_url)
+            except ValueError as e:
+                callback_status = f"rejected ({str(e)})"
+                break
+            try:
+                response = requests.post(callback_url, json=job, timeout=self.callback_timeout, allow_redirects=False)
+                if response.status_code < 500:
+                    callback_status = f"delivered ({response.status_code})"
+                    break
+                callback_status = f"failed ({response.status_code})"
+            except requests.RequestException as e:
+                callback_status = f"failed ({type(e).__name__})"
+            if attempt < self.callback_retries - 1:
+                time.sleep(2 ** attempt)
+
+        self.connection().execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id))
+
+    def ensure_workers(self):
+        # Threads do not survive a fork, so every gunicorn worker starts its own
+        if self.workers_pid == os.getpid():
+            return
+        with self.lock:
+            if self.workers_pid == os.getpid():
+                return
+            self.busy = 0
+            for _ in range(self.workers):
+                threading.Thread(target=self.run_worker, daemon=True).start()
+            self.workers_pid = os.getpid()
+
+    def run_worker(self):
+        while True:
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                print(f"Job worker error: {str(e)}")
+            # Woken early by a local submit; jobs queued by other processes
+            # are picked up on the next poll
+            with self.wakeup:
+                self.wakeup.wait(self.poll_interval)
+
+    def stats(self):
+        counts = dict(self.connection().execute("SELECT status, count(*) FROM jobs GROUP BY status").fetchall())
+        with self.lock:
+            busy = self.busy
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'workers_per_process': self.workers,
+            'busy_workers_here': busy,
+        }
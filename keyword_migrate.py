@@ -0,0 +1,378 @@
+"""Migrate a country keyword table from VARCHAR metrics to typed numeric columns.
+
+Usage: python keyword_migrate.py --country us [--mysql] [--dry-run]
+                                 [--allow-lossy] [--drop-old]
+       python keyword_migrate.py --country us [--mysql] --indexes-only
+
+The metric columns get these types (the keyword and the MySQL "Competition"
+label stay text):
+
+    "Avg. monthly searches"          integer
+    "Competition (indexed value)"    smallint
+    "Top of page bid (low range)"    double precision
+    "Top of page bid (high range)"   double precision
+    "Searches: <Mon YYYY>"           integer, one column per month
+
+The monthly series stays one column per month: an array or child table would
+change the row layout every reader of these tables relies on.
+
+The typed copy is built next to the live table as <table>_typed and then
+verified: the row counts must match and every non-blank source value must
+have become a number. Values that do not parse ("n/a", "1K-10K") abort the
+migration and are printed, unless --allow-lossy is given, in which case they
+become NULL. After that the typed table is swapped in with a single rename.
+The old table is kept as <table>_varchar for rollback and for
+benchmarks/bench_typed_schema.py, unless --drop-old is given. --dry-run stops
+after the verification and leaves <table>_typed in place.
+
+--indexes-only skips the migration and builds the indexes the app relies on
+(the exact-match index, plus the pg_trgm trigram index on PostgreSQL) on the
+live table. PostgreSQL builds them with CREATE INDEX CONCURRENTLY and MySQL
+as online DDL, so writers are not blocked; run it at deploy time. The apps
+only check that the indexes exist.
+"""
+import argparse, os, sys, time
+
+from dotenv import load_dotenv
+
+integer_type = {'postgres': 'integer', 'mysql': 'INT'}
+smallint_type = {'postgres': 'smallint', 'mysql': 'SMALLINT'}
+float_type = {'postgres': 'double precision', 'mysql': 'DOUBLE'}
+
+# Patterns a text value must match (after trimming and dropping thousands
+# separators) to be converted; anything else counts as lossy
+integer_pattern = r'^-?[0-9]+(\.0+)?$'
+float_pattern = r'^-?([0-9]+\.?[0-9]*|\.[0-9]+)$'
+
+
+def column_type(column):
+    # Returns (type map, pattern) for a metric column, or None for text columns
+    name = column.strip().lower()
+    if name == 'avg. monthly searches' or name.startswith('searches:'):
+        return integer_type, integer_pattern
+    if name == 'competition (indexed value)':
+        return smallint_type, integer_pattern
+    if name in ('top of page bid (low range)', 'top of page bid (high range)'):
+        return float_type, float_pattern
+    return None
+
+
+class Dialect:
+    """The SQL that differs between the PostgreSQL and MySQL builds."""
+
+    def __init__(self, name):
+        self.name = name
+        self.quote = '"' if name == 'postgres' else '`'
+
+    def column(self, column):
+        return f'{self.quote}{column}{self.quote}'
+
+    def cleaned(self, column):
+        return f"replace(trim({self.column(column)}), ',', '')"
+
+    def matches(self, column, pattern):
+        if self.name == 'postgres':
+            return f"{self.cleaned(column)} ~ '{pattern}'"
+        # MySQL string literals treat the backslash as an escape character
+        return f"{self.cleaned(column)} REGEXP '{pattern.replace(chr(92), chr(92) * 2)}'"
+
+    def current_schema(self):
+        return 'current_schema()' if self.name == 'postgres' else 'DATABASE()'
+
+    def converted(self, column, types, pattern):
+        if self.name == 'postgres':
+            cast = f'{self.cleaned(column)}::numeric::{types[self.name]}'
+        else:
+            # DECIMAL converts "1.00" to an INT column without a strict-mode warning
+            cast = f'CAST({self.cleaned(column)} AS DECIMAL(30, 10))'
+        return f'CASE WHEN {self.matches(column, pattern)} THEN {cast} END'
+
+    def not_blank(self, column):
+        return f"nullif(trim({self.column(column)}), '') IS NOT NULL"
+
+
+def connect(dialect):
+    if dialect.name == 'postgres':
+        import psycopg2
+        return psycopg2.connect(
+            host=os.environ.get('POSTGRES_HOST'),
+            user=os.environ.get('POSTGRES_USER'),
+            password=os.environ.get('POSTGRES_PASSWORD'),
+            database=os.environ.get('POSTGRES_DB'),
+            port=os.environ.get('POSTGRES_PORT'),
+        )
+
+    import MySQLdb
+    return MySQLdb.connect(
+        host=os.getenv('MYSQL_HOST'),
+        user=os.getenv('MYSQL_USER'),
+        passwd=os.getenv('MYSQL_PASSWORD'),
+        db=os.getenv('MYSQL_DB'),
+        port=int(os.getenv('MYSQL_PORT', 3306)),
+    )
+
+
+def table_columns(cursor, dialect, table_name):
+    # Returns [(column, is_text)] in table order
+    cursor.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        f"WHERE table_schema = {dialect.current_schema()} AND table_name = %s ORDER BY ordinal_position",
+        (table_name,)
+    )
+    return [(column, data_type.lower() in ('character varying', 'varchar', 'text', 'char', 'character'))
+            for column, data_type in cursor.fetchall()]
+
+
+def create_typed_table(cursor, dialect, table_name, typed_name, columns):
+    definitions = []
+    selects = []
+    for column, is_text in columns:
+        target = column_type(column)
+        if target is None or not is_text:
+            # Text columns and columns that are already typed are copied as-is
+            definitions.append(None)
+            selects.append(dialect.column(column))
+        else:
+            types, pattern = target
+            definitions.append(f'{dialect.column(column)} {types[dialect.name]}')
+            selects.append(dialect.converted(column, types, pattern))
+
+    cursor.execute(f'DROP TABLE IF EXISTS {typed_name}')
+    if dialect.name == 'postgres':
+        cursor.execute(f'CREATE TABLE {typed_name} (LIKE {table_name} INCLUDING DEFAULTS)')
+        for (column, _), definition in zip(columns, definitions):
+            if definition is not None:
+                types, _ = column_type(column)
+                cursor.execute(
+                    f'ALTER TABLE {typed_name} ALTER COLUMN {dialect.column(column)} '
+                    f'TYPE {types[dialect.name]} USING NULL'
+                )
+    else:
+        cursor.execute(f'CREATE TABLE {typed_name} LIKE {table_name}')
+        changes = [f'MODIFY {definition}' for definition in definitions if definition is not None]
+        if changes:
+            cursor.execute(f'ALTER TABLE {typed_name} {", ".join(changes)}')
+
+    column_list = ', '.join(dialect.column(column) for column, _ in columns)
+    cursor.execute(
+        f'INSERT INTO {typed_name} ({column_list}) SELECT {", ".join(selects)} FROM {table_name}'
+    )
+
+
+def verify(cursor, dialect, table_name, typed_name, columns):
+    # Returns a list of problems; an empty list means nothing was lost
+    problems = []
+    cursor.execute(f'SELECT count(*) FROM {table_name}')
+    source_count = cursor.fetchone()[0]
+    cursor.execute(f'SELECT count(*) FROM {typed_name}')
+    typed_count = cursor.fetchone()[0]
+    if source_count != typed_count:
+        problems.append(f"row count {source_count} became {typed_count}")
+
+    for column, is_text in columns:
+        target = column_type(column)
+        if target is None or not is_text:
+            continue
+        cursor.execute(f'SELECT count(*) FROM {table_name} WHERE {dialect.not_blank(column)}')
+        source_values = cursor.fetchone()[0]
+        cursor.execute(f'SELECT count({dialect.column(column)}) FROM {typed_name}')
+        typed_values = cursor.fetchone()[0]
+        if source_values != typed_values:
+            cursor.execute(
+                f'SELECT DISTINCT {dialect.column(column)} FROM {table_name} '
+                f'WHERE {dialect.not_blank(column)} AND NOT ({dialect.matches(column, target[1])}) LIMIT 5'
+            )
+            samples = ', '.join(repr(row[0]) for row in cursor.fetchall())
+            problems.append(f"{column}: {source_values - typed_values} values did not parse, e.g. {samples}")
+    return problems
+
+
+def create_trigram_extension(connection):
+    # Run before any other work, since a failure ends the transaction. Needs
+    # the CREATE privilege on the database; without pg_trgm the trigram index
+    # is skipped and the app scans the length window instead.
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        connection.commit()
+        return True
+    except Exception as e:
+        connection.rollback()
+        print(f"pg_trgm is not available, skipping the trigram index: {str(e)}")
+        return False
+
+
+def create_indexes(cursor, dialect, table_name, typed_name):
+    # The indexes the app relies on, built before the typed table goes live
+    if dialect.name == 'postgres':
+        cursor.execute(f'CREATE INDEX {typed_name}_keyword_lower_idx ON {typed_name} (lower(trim("Keyword")))')
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is not None:
+            cursor.execute(
+                f'CREATE INDEX {typed_name}_keyword_trgm_idx '
+                f'ON {typed_name} USING gin (lower(trim("Keyword")) gin_trgm_ops)'
+            )
+        cursor.execute(f'ANALYZE {typed_name}')
+    else:
+        # LIKE already copied the exact-match index of the live table
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (typed_name, f'{table_name}_keyword_lower_idx')
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                f'CREATE INDEX {table_name}_keyword_lower_idx ON {typed_name} ((lower(trim(`Keyword`))))'
+            )
+
+
+def create_index_concurrently(cursor, index_name, definition):
+    # A failed concurrent build leaves an invalid index behind, which
+    # IF NOT EXISTS would then keep; drop it and build again
+    cursor.execute(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (index_name,)
+    )
+    row = cursor.fetchone()
+    if row is not None and row[0]:
+        print(f"{index_name} already exists")
+        return
+    if row is not None:
+        cursor.execute(f'DROP INDEX CONCURRENTLY {index_name}')
+
+    started = time.time()
+    cursor.execute(f'CREATE INDEX CONCURRENTLY {index_name} {definition}')
+    print(f"Built {index_name} in {time.time() - started:.1f} seconds")
+
+
+def create_live_indexes(dialect, table_name):
+    # Builds the indexes the app relies on for a table that is already live
+    connection = connect(dialect)
+    cursor = connection.cursor()
+    try:
+        if dialect.name == 'postgres':
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+            connection.autocommit = True
+            create_index_concurrently(
+                cursor, f'{table_name}_keyword_lower_idx', f'ON {table_name} (lower(trim("Keyword")))'
+            )
+            if create_trigram_extension(connection):
+                create_index_concurrently(
+                    cursor, f'{table_name}_keyword_trgm_idx',
+                    f'ON {table_name} USING gin (lower(trim("Keyword")) gin_trgm_ops)'
+                )
+            return 0
+
+        # Functional key parts need MySQL 8.0.13 or later
+        index_name = f'{table_name}_keyword_lower_idx'
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (table_name, index_name)
+        )
+        if cursor.fetchone() is not None:
+            print(f"{index_name} already exists")
+            return 0
+        started = time.time()
+        cursor.execute(
+            f'ALTER TABLE {table_name} ADD INDEX {index_name} ((lower(trim(`Keyword`)))), '
+            'ALGORITHM=INPLACE, LOCK=NONE'
+        )
+        print(f"Built {index_name} in {time.time() - started:.1f} seconds")
+        return 0
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def swap_tables(cursor, dialect, table_name, typed_name, backup_name):
+    if dialect.name == 'mysql':
+        # Index names belong to their table in MySQL, so one rename is enough
+        cursor.execute(f'RENAME TABLE {table_name} TO {backup_name}, {typed_name} TO {table_name}')
+        return
+
+    # Index names are global in PostgreSQL; move the old ones out of the way
+    cursor.execute(f'ALTER TABLE {table_name} RENAME TO {backup_name}')
+    cursor.execute(f'ALTER TABLE {typed_name} RENAME TO {table_name}')
+    for suffix in ('keyword_lower_idx', 'keyword_trgm_idx'):
+        cursor.execute(f'ALTER INDEX IF EXISTS {table_name}_{suffix} RENAME TO {backup_name}_{suffix}')
+        cursor.execute(f'ALTER INDEX IF EXISTS {typed_name}_{suffix} RENAME TO {table_name}_{suffix}')
+
+
+def migrate(dialect, table_name, dry_run=False, allow_lossy=False, drop_old=False):
+    typed_name = f'{table_name}_typed'
+    backup_name = f'{table_name}_varchar'
+    connection = connect(dialect)
+    if dialect.name == 'postgres':
+        create_trigram_extension(connection)
+    cursor = connection.cursor()
+    try:
+        columns = table_columns(cursor, dialect, table_name)
+        if not columns:
+            print(f"{table_name} does not exist")
+            return 1
+        if not any(is_text and column_type(column) for column, is_text in columns):
+            print(f"{table_name} already has typed metric columns")
+            return 0
+
+        started = time.time()
+        create_typed_table(cursor, dialect, table_name, typed_name, columns)
+        print(f"Built {typed_name} in {time.time() - started:.1f} seconds")
+
+        problems = verify(cursor, dialect, table_name, typed_name, columns)
+        for problem in problems:
+            print(f"Verification: {problem}")
+        if problems and not allow_lossy:
+            connection.rollback()
+            cursor.execute(f'DROP TABLE IF EXISTS {typed_name}')
+            connection.commit()
+            print("Nothing was changed. Fix the values above or rerun with --allow-lossy.")
+            return 1
+
+        create_indexes(cursor, dialect, table_name, typed_name)
+        connection.commit()
+        if dry_run:
+            print(f"Dry run: {typed_name} is ready, {table_name} is unchanged")
+            return 0
+
+        cursor.execute(f'DROP TABLE IF EXISTS {backup_name}')
+        swap_tables(cursor, dialect, table_name, typed_name, backup_name)
+        if drop_old:
+            cursor.execute(f'DROP TABLE {backup_name}')
+        connection.commit()
+        print(f"{table_name} now has typed metric columns"
+              + ("" if drop_old else f"; the old table is kept as {backup_name}"))
+        return 0
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--country', required=True)
+    parser.add_argument('--mysql', action='store_true', help="migrate the app1.py MySQL table")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--allow-lossy', action='store_true')
+    parser.add_argument('--drop-old', action='store_true')
+    parser.add_argument('--indexes-only', action='store_true', help="only build the app's indexes on the live table")
+    args = parser.parse_args()
+
+    load_dotenv()
+    country = args.country.strip().lower()
+    if not country.isalpha():
+        parser.error("Invalid country code.")
+
+    if args.mysql:
+        dialect, table_name = Dialect('mysql'), f'google_keyword_data_{country}'
+    else:
+        dialect, table_name = Dialect('postgres'), f'googlekeywords_data_{country}'
+    if args.indexes_only:
+        return create_live_indexes(dialect, table_name)
+    return migrate(dialect, table_name, args.dry_run, args.allow_lossy, args.drop_old)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
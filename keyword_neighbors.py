@@ -0,0 +1,187 @@
+"""Precompute the related keywords of every keyword in a country table.
+
+Usage: python keyword_neighbors.py --country us [--processes 8] [--chunk-size 500]
+
+Every distinct normalized keyword of googlekeywords_data_<cc> is scored
+against the keywords in its length window with the same scorer the app
+uses, across a pool of processes. Every keyword's character counts are
+computed once into a matrix shared by the workers, so the shared-character
+bound is checked for the whole window with one vectorized pass per seed and
+difflib only runs on the few candidates that pass it. Each pair that
+reaches similarity_threshold is stored with its score in
+googlekeywords_neighbors_<cc> (keyword, neighbor, score), indexed on
+keyword. The table is built under a staging name and swapped in with a
+single rename.
+
+app.py then answers /keyword_ideas and /keyword_ideas/batch for a keyword
+in the table with one indexed join instead of scoring candidates, even when
+the in-memory corpus is loaded. Keywords added after the build
+are only found by seeds that are not in the list yet, so rebuild after
+large loads (keyword_ingest.py).
+"""
+import argparse, csv, multiprocessing, os, sys, tempfile, time
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+
+from keyword_similarity import KeywordScorer
+
+# Distinct normalized keywords sorted by length, and the index where each
+# length starts, with one row of character counts and the length of each
+# keyword. Set before the pool forks, so workers share them for free.
+keywords = []
+length_offsets = []
+char_counts = np.zeros((0, 1), dtype=np.uint8)
+keyword_lengths = np.zeros(0, dtype=np.int64)
+
+# The most frequent characters get a column each; the rest share the last
+# one, which keeps the matrix small and the bound an upper bound.
+count_columns = 63
+
+
+def index_keywords(raw_keywords):
+    normalized = {keyword.strip().lower() for keyword in raw_keywords if isinstance(keyword, str)}
+    normalized.discard('')
+    ordered = sorted(normalized, key=lambda keyword: (len(keyword), keyword))
+
+    offsets = []
+    position = 0
+    max_length = len(ordered[-1]) if ordered else 0
+    for length in range(max_length + 2):
+        while position < len(ordered) and len(ordered[position]) < length:
+            position += 1
+        offsets.append(position)
+    return ordered, offsets
+
+
+def count_characters(ordered):
+    # Returns a (len(ordered), columns) matrix with the number of times each
+    # character occurs in each keyword, and the keyword lengths
+    frequencies = Counter()
+    for keyword in ordered:
+        frequencies.update(keyword)
+    columns = {char: column for column, (char, _) in enumerate(frequencies.most_common(count_columns))}
+    other = len(columns)
+
+    lengths = np.fromiter((len(keyword) for keyword in ordered), dtype=np.int64, count=len(ordered))
+    dtype = np.uint8 if not len(ordered) or lengths.max() <= 255 else np.uint16
+    counts = np.zeros((len(ordered), other + 1), dtype=dtype)
+    for row, keyword in enumerate(ordered):
+        for char, count in Counter(keyword).items():
+            counts[row, columns.get(char, other)] += count
+    return counts, lengths
+
+
+def neighbors_of(bounds):
+    # Returns (keyword, neighbor, score) for the seeds keywords[start:end]
+    start, end = bounds
+    last = len(length_offsets) - 1
+    results = []
+    for position in range(start, end):
+        seed = keywords[position]
+        scorer = KeywordScorer(seed)
+        low = length_offsets[min(scorer.min_length, last)]
+        high = length_offsets[min(scorer.max_length + 1, last)]
+
+        # Same bound as KeywordScorer's shared count, for the whole window at
+        # once. Merging rare characters into one column can only raise it.
+        shared = np.minimum(char_counts[low:high], char_counts[position]).sum(axis=1)
+        passing = np.flatnonzero(2.0 * shared / (len(seed) + keyword_lengths[low:high]) >= scorer.threshold)
+        for offset in passing.tolist():
+            candidate = keywords[low + offset]
+            score = scorer.score(candidate)
+            if score is not None:
+                results.append((seed, candidate, score))
+    return results
+
+
+def build_neighbors(raw_keywords, processes=None, chunk_size=500, spool=None):
+    # Writes every (keyword, neighbor, score) row to `spool` as CSV and
+    # returns the number of rows
+    global keywords, length_offsets, char_counts, keyword_lengths
+    keywords, length_offsets = index_keywords(raw_keywords)
+    char_counts, keyword_lengths = count_characters(keywords)
+    chunks = [(start, min(start + chunk_size, len(keywords))) for start in range(0, len(keywords), chunk_size)]
+
+    writer = csv.writer(spool, lineterminator='\n')
+    count = 0
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        for done, results in enumerate(pool.imap_unordered(neighbors_of, chunks), 1):
+            writer.writerows(results)
+            count += len(results)
+            if done % 100 == 0 or done == len(chunks):
+                print(f"Scored {min(done * chunk_size, len(keywords))}/{len(keywords)} keywords, {count} pairs")
+    return count
+
+
+def connect():
+    import psycopg2
+    return psycopg2.connect(
+        host=os.environ.get('POSTGRES_HOST'),
+        user=os.environ.get('POSTGRES_USER'),
+        password=os.environ.get('POSTGRES_PASSWORD'),
+        database=os.environ.get('POSTGRES_DB'),
+        port=os.environ.get('POSTGRES_PORT'),
+    )
+
+
+def load_keywords(connection, table_name):
+    with connection.cursor(name=f'neighbors_{table_name}') as cursor:
+        cursor.itersize = 10000
+        cursor.execute(f'SELECT "Keyword" FROM {table_name}')
+        return [row[0] for row in cursor]
+
+
+def store_neighbors(connection, neighbors_table, spool):
+    staging = f'{neighbors_table}_staging'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+        cursor.execute(f'CREATE TABLE {staging} (keyword text, neighbor text, score double precision)')
+        cursor.copy_expert(f'COPY {staging} (keyword, neighbor, score) FROM STDIN WITH (FORMAT csv)', spool)
+        cursor.execute(f'CREATE INDEX {staging}_keyword_idx ON {staging} (keyword)')
+        cursor.execute(f'ANALYZE {staging}')
+        connection.commit()
+
+        # Readers see the old lists or the new ones, never a partial table
+        cursor.execute(f'DROP TABLE IF EXISTS {neighbors_table}')
+        cursor.execute(f'ALTER TABLE {staging} RENAME TO {neighbors_table}')
+        cursor.execute(f'ALTER INDEX {staging}_keyword_idx RENAME TO {neighbors_table}_keyword_idx')
+        connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--country', required=True)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    load_dotenv()
+    country = args.country.strip().lower()
+    if not country.isalpha():
+        parser.error("Invalid country code.")
+    table_name = f'googlekeywords_data_{country}'
+    neighbors_table = f'googlekeywords_neighbors_{country}'
+
+    started = time.time()
+    connection = connect()
+    try:
+        raw_keywords = load_keywords(connection, table_name)
+        print(f"Loaded {len(raw_keywords)} keywords from {table_name}")
+
+        with tempfile.TemporaryFile(mode='w+', newline='') as spool:
+            count = build_neighbors(raw_keywords, args.processes, args.chunk_size, spool)
+            spool.seek(0)
+            store_neighbors(connection, neighbors_table, spool)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    print(f"Stored {count} neighbor pairs in {neighbors_table} in {time.time() - started:.1f} seconds")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
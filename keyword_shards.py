@@ -0,0 +1,171 @@
+import atexit, multiprocessing, os, threading
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from keyword_similarity import KeywordScorer, similarity_length_bounds
+
+# Shared blocks a pool process keeps attached (name -> (block, offsets, blob))
+attached = OrderedDict()
+max_attached = 8
+
+# Blocks published by this process or inherited from the process that forked
+# it (name -> SharedKeywords). Each is unlinked by whoever replaces it, or at
+# exit by the process that created it.
+published = {}
+
+
+class SharedKeywords:
+    """The normalized keywords of a KeywordStore in one shared memory block.
+
+    The block holds the keywords in length order as one UTF-8 blob, preceded
+    by an int64 offset table, so pool processes read them by name without
+    anything being pickled per request.
+
+    The creating process owns the block and unlinks it at exit. When the
+    snapshot is replaced, ``release()`` unlinks it from whichever process
+    replaces it, including a gunicorn worker replacing a block preloaded by
+    the master: pool processes that already attached it keep reading it,
+    new attaches fail and fall back to inline scoring, and the other workers
+    swap in their own snapshot within one refresh interval.
+    """
+
+    def __init__(self, store):
+        encoded = [
+            keyword.strip().lower().encode('utf-8') if isinstance(keyword, str) else b''
+            for keyword in (store.keywords[row_id] for row_id in store.length_order.tolist())
+        ]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(keyword) for keyword in encoded], out=offsets[1:])
+
+        self.count = len(encoded)
+        self.block = shared_memory.SharedMemory(create=True, size=max(offsets.nbytes + int(offsets[-1]), 1))
+        self.block.buf[:offsets.nbytes] = offsets.tobytes()
+        self.block.buf[offsets.nbytes:offsets.nbytes + int(offsets[-1])] = b''.join(encoded)
+        self.name = self.block.name
+        self.owner_pid = os.getpid()
+        published[self.name] = self
+        # Rows without a string keyword are never scored
+        self.valid = np.array([isinstance(store.keywords[row_id], str) for row_id in store.length_order.tolist()])
+
+    def release(self):
+        if self.block is None:
+            return
+        self.block.close()
+        try:
+            self.block.unlink()
+        except FileNotFoundError:
+            # Another worker that inherited the block replaced it first
+            pass
+        self.block = None
+        published.pop(self.name, None)
+
+
+@atexit.register
+def release_published():
+    # Forked workers inherit this handler and the blocks their parent
+    # created; only the creator unlinks those at exit
+    for shared in list(published.values()):
+        if shared.owner_pid == os.getpid():
+            shared.release()
+
+
+def attach(name, count):
+    # Runs in a pool process; keeps the last few blocks attached
+    if name in attached:
+        attached.move_to_end(name)
+        return attached[name][1:]
+
+    # forkserver processes share the web worker's resource tracker, so the
+    # registration made here is the owner's and must not be undone
+    block = shared_memory.SharedMemory(name=name)
+    offsets = np.ndarray((count + 1,), dtype=np.int64, buffer=block.buf)
+    blob = block.buf[offsets.nbytes:]
+    attached[name] = (block, offsets, blob)
+
+    while len(attached) > max_attached:
+        _, (old_block, old_offsets, old_blob) = attached.popitem(last=False)
+        old_blob.release()
+        del old_offsets
+        old_block.close()
+    return offsets, blob
+
+
+def score_shard(name, count, sanitized_keyword, start, end):
+    # Returns (positions, scores) of the keywords at length-order positions
+    # [start, end) that reach the threshold
+    offsets, blob = attach(name, count)
+    scorer = KeywordScorer(sanitized_keyword)
+    positions = []
+    scores = []
+    bounds = offsets[start:end + 1].tolist()
+    for index in range(end - start):
+        candidate = bytes(blob[bounds[index]:bounds[index + 1]]).decode('utf-8')
+        score = scorer.score(candidate)
+        if score is not None:
+            positions.append(start + index)
+            scores.append(score)
+    return np.array(positions, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+
+class ShardedScorer:
+    """Scores one seed against a corpus across a pool of processes.
+
+    The seed's length window is cut into ``shards`` contiguous ranges that
+    are scored in parallel and concatenated in order, so the result is the
+    same as ``KeywordStore.related_ids()``. Windows smaller than
+    ``min_window`` are scored inline, where the pool round trip would cost
+    more than it saves. Each gunicorn worker starts its own pool on first use.
+    """
+
+    def __init__(self, shards, min_window=20000):
+        self.shards = shards
+        self.min_window = min_window
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_pid = None
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None or self.pool_pid != os.getpid():
+                # forkserver children start clean instead of copying a
+                # multi-threaded web worker
+                self.pool = ProcessPoolExecutor(self.shards, mp_context=multiprocessing.get_context('forkserver'))
+                self.pool_pid = os.getpid()
+            return self.pool
+
+    def publish(self, store):
+        return SharedKeywords(store)
+
+    def related_ids(self, store, shared, sanitized_keyword):
+        # Returns (row_ids, scores) like KeywordStore.related_ids()
+        min_length, max_length = similarity_length_bounds(sanitized_keyword)
+        last = len(store.length_offsets) - 1
+        start = int(store.length_offsets[min(max(min_length, 0), last)])
+        end = int(store.length_offsets[min(max(max_length + 1, 0), last)])
+        if end - start < self.min_window or shared is None or shared.block is None:
+            return store.related_ids(sanitized_keyword)
+
+        step = -(-(end - start) // self.shards)
+        try:
+            futures = [
+                self.get_pool().submit(score_shard, shared.name, shared.count, sanitized_keyword,
+                                       low, min(low + step, end))
+                for low in range(start, end, step)
+            ]
+            results = [future.result() for future in futures]
+        except Exception as e:
+            # e.g. the snapshot was replaced and its block unlinked meanwhile
+            print(f"Sharded scoring failed, scoring inline: {str(e)}")
+            if isinstance(e, BrokenExecutor):
+                # A pool process died; start a new pool on the next request
+                with self.lock:
+                    self.pool = None
+            return store.related_ids(sanitized_keyword)
+
+        positions = np.concatenate([positions for positions, _ in results])
+        scores = np.concatenate([scores for _, scores in results])
+        keep = shared.valid[positions]
+        return store.length_order[positions[keep]].astype(np.int64), scores[keep]
@@ -0,0 +1,84 @@
+import difflib
+from collections import Counter
+
+# Minimum difflib ratio for a row to count as a related keyword
+similarity_threshold = 0.8
+
+# pg_trgm similarity app.py uses to pull candidates from the trigram index
+# when the in-memory corpus is not loaded. This is a heuristic, not a bound:
+# a pair with difflib ratio >= 0.8 can share as little as one trigram (each
+# deleted character kills up to three trigrams and each inserted one two),
+# so no useful trigram threshold keeps every qualifying pair. At 0.3 about 4%
+# of qualifying pairs of random strings are dropped (tests/test_keyword_similarity.py
+# pins this), e.g. "abcdefghij" / "abxdefyhij" has ratio 0.8 but trigram
+# similarity 0.29. The in-memory corpus scores the whole length window and
+# has no such loss.
+trigram_candidate_threshold = 0.3
+
+
+def similarity_length_bounds(keyword, threshold=similarity_threshold):
+    # difflib's ratio is 2*M / (len(a) + len(b)) and M can never exceed the
+    # shorter string, so only candidates within these lengths can reach the
+    # threshold.
+    length = len(keyword)
+    min_length = int(length * threshold / (2 - threshold))
+    max_length = int(length * (2 - threshold) / threshold) + 1
+    return min_length, max_length
+
+
+class KeywordScorer:
+    """Scores candidates against one seed keyword.
+
+    Before running difflib's exact (and slow) ratio, each candidate goes
+    through two cheap upper bounds: the length bound (same as
+    ``real_quick_ratio``) and the shared character count (same as
+    ``quick_ratio``). Candidates that cannot reach the threshold are dropped
+    without building a SequenceMatcher for them.
+    """
+
+    def __init__(self, sanitized_keyword, threshold=similarity_threshold):
+        self.keyword = sanitized_keyword
+        self.threshold = threshold
+        self.min_length, self.max_length = similarity_length_bounds(sanitized_keyword, threshold)
+        self.keyword_counts = Counter(sanitized_keyword)
+        self.matcher = difflib.SequenceMatcher(None, sanitized_keyword)
+
+    def score(self, candidate):
+        # Returns the difflib ratio, or None when the candidate cannot reach
+        # the threshold. `candidate` must already be stripped and lowercased.
+        candidate_length = len(candidate)
+        if not self.min_length <= candidate_length <= self.max_length:
+            return None
+
+        total_length = len(self.keyword) + candidate_length
+        if total_length == 0:
+            return 1.0
+
+        candidate_counts = Counter(candidate)
+        shared = sum(min(count, candidate_counts[char]) for char, count in self.keyword_counts.items())
+        if 2.0 * shared / total_length < self.threshold:
+            return None
+
+        self.matcher.set_seq2(candidate)
+        ratio = self.matcher.ratio()
+        if ratio < self.threshold:
+            return None
+        return ratio
+
+
+def iter_related_rows(sanitized_keyword, rows, threshold=similarity_threshold):
+    # Yields (row, score) pairs, in input order, for every row whose first
+    # column ("Keyword") reaches the threshold. `rows` may be any iterable,
+    # e.g. a server-side cursor, and is consumed lazily.
+    scorer = KeywordScorer(sanitized_keyword, threshold)
+    for row in rows:
+        if row and isinstance(row[0], str):
+            score = scorer.score(row[0].strip().lower())
+            if score is not None:
+                yield row, score
+
+
+def score_related_rows(sanitized_keyword, rows, threshold=similarity_threshold):
+    # Returns (row, score) pairs, in input order, for every row whose first
+    # column ("Keyword") reaches the threshold. Each row is scored once.
+    return list(iter_related_rows(sanitized_keyword, rows, threshold))
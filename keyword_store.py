@@ -0,0 +1,298 @@
+import sys
+from array import array
+
+import numpy as np
+
+from keyword_similarity import KeywordScorer, similarity_length_bounds
+
+# Column positions in a googlekeywords_data_<cc> row
+KEYWORD_COLUMN = 0
+VOLUME_COLUMN = 1
+COMPETITION_COLUMN = 2
+BID_LOW_COLUMN = 3
+BID_HIGH_COLUMN = 4
+MONTHLY_COLUMNS = range(5, 17)
+ROW_WIDTH = 17
+
+# Stored in integer columns when a value is missing or not a number
+MISSING = -1
+
+# Metrics the related keywords can be sorted by
+SORT_FIELDS = ('similarity', 'volume', 'competition', 'low_bid', 'high_bid')
+
+
+def parse_int(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def parse_float(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def format_int(value):
+    return None if value == MISSING else str(int(value))
+
+
+def format_float(value):
+    return None if np.isnan(value) else repr(float(value))
+
+
+def decimal_places(text):
+    # Digits after the decimal point of a number read as text, e.g. 2 for "1.50"
+    _, point, fraction = text.strip().partition('.')
+    return len(fraction) if point else 0
+
+
+def fixed_float(places):
+    # format_float for a text column whose values are written with `places`
+    # decimals, so "2.00" comes back as "2.00" rather than "2.0"
+    def format_fixed(value):
+        return None if np.isnan(value) else f'{float(value):.{places}f}'
+    return format_fixed
+
+
+def number_int(value):
+    return None if value == MISSING else int(value)
+
+
+def number_float(value):
+    return None if np.isnan(value) else float(value)
+
+
+# Rebuilds the source value of a column read as text or as a number
+text_formats = {format_int: format_int, format_float: format_float}
+number_formats = {format_int: number_int, format_float: number_float}
+
+
+class KeywordStore:
+    """Column-oriented, read-only copy of a country keyword table.
+
+    Keywords live in one list of interned strings and every metric sits in a
+    contiguous NumPy array indexed by integer row id, which takes a fraction of
+    the memory of the original VARCHAR tuples and lets filtering and sorting
+    run vectorized. ``row(row_id)`` rebuilds the original tuple: values that
+    do not survive the round trip through a number (empty strings, "1,000",
+    stray text) are kept verbatim in a small per-row overflow map. Bids read
+    as text are rebuilt with the number of decimals of the column's first
+    value, held in ``decimals``. Columns that the database already returns
+    as numbers (the typed schema) are rebuilt as numbers; ``typed`` holds
+    their positions.
+    """
+
+    def __init__(self, keywords, volume, competition, bid_low, bid_high, monthly, overflow, width, typed=frozenset(),
+                 lengths=None, length_order=None, length_offsets=None, decimals=None):
+        self.keywords = keywords
+        self.volume = volume
+        self.competition = competition
+        self.bid_low = bid_low
+        self.bid_high = bid_high
+        self.monthly = monthly
+        self.overflow = overflow
+        self.width = width
+        self.typed = typed
+        self.decimals = decimals or {}
+        self.formats = [number_formats if column in typed else text_formats for column in range(ROW_WIDTH)]
+        for column, places in self.decimals.items():
+            if column not in typed:
+                self.formats[column] = {format_float: fixed_float(places)}
+
+        # Row ids ordered by normalized keyword length, with the offset where
+        # each length starts, so a length window is a single slice. A corpus
+        # file passes them in already computed.
+        if lengths is None:
+            lengths = np.array(
+                [len(keyword.strip().lower()) if isinstance(keyword, str) else 0 for keyword in keywords],
+                dtype=np.int32
+            )
+            length_order = np.argsort(lengths, kind='stable').astype(np.int32)
+            length_offsets = np.searchsorted(lengths[length_order], np.arange(int(lengths.max(initial=0)) + 2))
+        self.lengths = lengths
+        self.length_order = length_order
+        self.length_offsets = length_offsets
+
+    @classmethod
+    def from_rows(cls, rows):
+        keywords = []
+        volume = array('q')
+        competition = array('h')
+        bid_low = array('d')
+        bid_high = array('d')
+        monthly = array('i')
+        overflow = {}
+        width = ROW_WIDTH
+        # Column -> True when the source returns numbers rather than text,
+        # decided by the first value that is not NULL
+        typed = {}
+        # Float column -> decimals of its values, decided by the first text
+        # value that is a number
+        decimals = {}
+        formatters = {}
+
+        columns = (
+            (VOLUME_COLUMN, volume, parse_int, format_int),
+            (COMPETITION_COLUMN, competition, parse_int, format_int),
+            (BID_LOW_COLUMN, bid_low, parse_float, format_float),
+            (BID_HIGH_COLUMN, bid_high, parse_float, format_float),
+        ) + tuple((column, monthly, parse_int, format_int) for column in MONTHLY_COLUMNS)
+
+        for row_id, row in enumerate(rows):
+            width = max(width, len(row))
+            keyword = row[KEYWORD_COLUMN] if row else None
+            keywords.append(sys.intern(keyword) if isinstance(keyword, str) else keyword)
+
+            extra = {}
+            for column, target, parse, format_value in columns:
+                raw = row[column] if column < len(row) else None
+                parsed = parse(raw)
+                missing = MISSING if target.typecode != 'd' else float('nan')
+                try:
+                    target.append(missing if parsed is None else parsed)
+                except OverflowError:
+                    target.append(missing)
+                if raw is not None and column not in typed:
+                    typed[column] = not isinstance(raw, str)
+                if typed.get(column):
+                    restored = number_formats[format_value](target[-1])
+                    same = restored == raw and type(restored) is type(raw)
+                else:
+                    if format_value is format_float and column not in decimals and parsed is not None and isinstance(raw, str):
+                        decimals[column] = decimal_places(raw)
+                        formatters[column] = fixed_float(decimals[column])
+                    same = formatters.get(column, format_value)(target[-1]) == raw
+                if not same:
+                    extra[column] = raw
+            for column in range(ROW_WIDTH, len(row)):
+                extra[column] = row[column]
+            if extra:
+                overflow[row_id] = extra
+
+        return cls(
+            keywords,
+            np.frombuffer(volume, dtype=np.int64),
+            np.frombuffer(competition, dtype=np.int16),
+            np.frombuffer(bid_low, dtype=np.float64),
+            np.frombuffer(bid_high, dtype=np.float64),
+            np.frombuffer(monthly, dtype=np.int32).reshape(-1, len(MONTHLY_COLUMNS)),
+            overflow,
+            width,
+            frozenset(column for column, is_typed in typed.items() if is_typed),
+            decimals=decimals,
+        )
+
+    def __len__(self):
+        return len(self.keywords)
+
+    @property
+    def nbytes(self):
+        # Size of the numeric columns and indexes, not counting the strings
+        return sum(column.nbytes for column in (
+            self.volume, self.competition, self.bid_low, self.bid_high, self.monthly,
+            self.lengths, self.length_order, self.length_offsets,
+        ))
+
+    def ids_with_length(self, min_length, max_length):
+        last = len(self.length_offsets) - 1
+        start = self.length_offsets[min(max(min_length, 0), last)]
+        end = self.length_offsets[min(max(max_length + 1, 0), last)]
+        return self.length_order[start:end]
+
+    def related_ids(self, sanitized_keyword):
+        # Returns (row_ids, scores) for every keyword reaching the threshold
+        scorer = KeywordScorer(sanitized_keyword)
+        min_length, max_length = similarity_length_bounds(sanitized_keyword, scorer.threshold)
+        row_ids = []
+        scores = []
+        for row_id in self.ids_with_length(min_length, max_length).tolist():
+            keyword = self.keywords[row_id]
+            if isinstance(keyword, str):
+                score = scorer.score(keyword.strip().lower())
+                if score is not None:
+                    row_ids.append(row_id)
+                    scores.append(score)
+        return np.array(row_ids, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+    def rank(self, row_ids, scores, min_volume=None, max_volume=None, min_competition=None,
+             max_competition=None, min_low_bid=None, max_low_bid=None, min_high_bid=None,
+             max_high_bid=None, sort_by=None, descending=True, limit=None):
+        # Filters and orders (row_ids, scores) with array operations only. A
+        # row missing a metric never passes a filter on that metric and sorts
+        # last. Only the top `limit` rows are fully sorted (one argpartition).
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        metrics = {
+            'similarity': scores,
+            'volume': self.metric(self.volume, row_ids),
+            'competition': self.metric(self.competition, row_ids),
+            'low_bid': self.bid_low[row_ids],
+            'high_bid': self.bid_high[row_ids],
+        }
+        bounds = (
+            ('volume', min_volume, max_volume),
+            ('competition', min_competition, max_competition),
+            ('low_bid', min_low_bid, max_low_bid),
+            ('high_bid', min_high_bid, max_high_bid),
+        )
+
+        mask = np.ones(len(row_ids), dtype=bool)
+        for name, low, high in bounds:
+            # NaN compares false, so missing values drop out here
+            if low is not None:
+                mask &= metrics[name] >= low
+            if high is not None:
+                mask &= metrics[name] <= high
+        if not mask.all():
+            row_ids, scores = row_ids[mask], scores[mask]
+            metrics = {name: values[mask] for name, values in metrics.items()}
+
+        if sort_by is None:
+            order = np.arange(len(row_ids))
+        else:
+            key = -metrics[sort_by] if descending else metrics[sort_by].copy()
+            key[np.isnan(key)] = np.inf
+            if limit is not None and limit < len(key):
+                top = np.argpartition(key, limit - 1)[:limit]
+                order = top[np.argsort(key[top], kind='stable')]
+            else:
+                order = np.argsort(key, kind='stable')
+
+        if limit is not None:
+            order = order[:limit]
+        return row_ids[order], scores[order]
+
+    @staticmethod
+    def metric(column, row_ids):
+        values = column[row_ids].astype(np.float64)
+        values[values == MISSING] = np.nan
+        return values
+
+    def row(self, row_id):
+        formats = self.formats
+        values = [self.keywords[row_id],
+                  formats[VOLUME_COLUMN][format_int](self.volume[row_id]),
+                  formats[COMPETITION_COLUMN][format_int](self.competition[row_id]),
+                  formats[BID_LOW_COLUMN][format_float](self.bid_low[row_id]),
+                  formats[BID_HIGH_COLUMN][format_float](self.bid_high[row_id])]
+        values.extend(
+            formats[column][format_int](value)
+            for column, value in zip(MONTHLY_COLUMNS, self.monthly[row_id])
+        )
+        values.extend([None] * (self.width - ROW_WIDTH))
+
+        for column, raw in self.overflow.get(row_id, {}).items():
+            values[column] = raw
+        return tuple(values)
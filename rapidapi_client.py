@@ -0,0 +1,133 @@
+import os, random, threading, time
+from urllib.parse import quote
+
+import requests
+from urllib3.util.retry import Retry
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that keeps failing."""
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} from {response.url}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures.
+
+    After ``failure_threshold`` consecutive failed calls the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. The first call after that
+    is let through as a probe: success closes the circuit, failure opens it
+    again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.probing or time.time() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("RapidAPI is failing, not calling it for now")
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self.probing = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if self.probing else 'open'
+
+
+class RapidAPIClient:
+    """Keep-alive client for the targeted-keyword-trend RapidAPI.
+
+    Connections are pooled per process, every request has connect and read
+    timeouts, transient failures (connection errors, timeouts, 429 and 5xx)
+    are retried with jittered exponential backoff, and a circuit breaker
+    stops hammering the API while it is down.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url, api_key, host, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.5, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": host}
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.session = None
+        self.session_pid = None
+        self.lock = threading.Lock()
+
+    def get_session(self):
+        # A session inherited through a fork would share sockets with the parent
+        with self.lock:
+            if self.session is None or self.session_pid != os.getpid():
+                session = requests.Session()
+                # Retries are ours; an explicit Retry keeps urllib3 from
+                # adding its own even when requests.adapters.DEFAULT_RETRIES
+                # was changed (app.py sets it), which also turned read
+                # timeouts into ConnectionErrors
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size, max_retries=Retry(0, read=False)
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.session = session
+                self.session_pid = os.getpid()
+            return self.session
+
+    def get_json(self, path):
+        self.breaker.before_call()
+        url = f"{self.base_url}/{quote(path)}"
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.get_session().get(url, headers=self.headers, timeout=self.timeout)
+                if response.status_code in self.retry_statuses:
+                    raise RetryableStatus(response)
+                response.raise_for_status()
+                data = response.json()
+                self.breaker.record_success()
+                return data
+            except (requests.ConnectionError, requests.Timeout, RetryableStatus) as e:
+                if attempt == self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"RapidAPI request failed ({str(e)}), retrying in {delay:.2f} seconds")
+                time.sleep(delay)
+            except requests.HTTPError:
+                # A 4xx means the request itself is wrong, not that the API is down
+                self.breaker.record_success()
+                raise
+            except Exception:
+                # e.g. a body that is not JSON; also keeps a probe from hanging open
+                self.breaker.record_failure()
+                raise
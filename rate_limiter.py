@@ -0,0 +1,110 @@
+import fcntl, os, threading, time
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call would have to wait longer than its timeout."""
+
+
+class TokenBucket:
+    """Token bucket shared by every process that uses the same state file.
+
+    ``acquire()`` is called *before* an upstream request. Under an exclusive
+    file lock it refills the bucket at ``rate`` tokens per second (up to
+    ``capacity``) and takes one token. When the bucket is empty the token is
+    borrowed, leaving the balance negative, and the caller waits for its
+    turn; later callers queue up behind it. A negative balance is therefore
+    the number of calls queued across all gunicorn workers.
+    """
+
+    def __init__(self, name, rate, capacity=1, state_dir=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.path = os.path.join(state_dir, f"{name}.bucket") if state_dir else None
+        if self.path:
+            os.makedirs(state_dir, exist_ok=True)
+
+        # Used instead of the state file when no state_dir is configured
+        self.local_state = (float(capacity), time.time())
+        self.lock = threading.Lock()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.backlog = 0.0
+
+    def reserve(self, timeout):
+        # Takes a token and returns how long the caller must wait for it
+        with self.lock:
+            if self.path is None:
+                return self.update_state(self.local_state, timeout, self.store_local_state)
+
+            with open(self.path, 'a+') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                try:
+                    state_file.seek(0)
+                    parts = state_file.read().split()
+                    state = (float(parts[0]), float(parts[1])) if len(parts) == 2 else (float(self.capacity), time.time())
+
+                    def store(new_state):
+                        state_file.seek(0)
+                        state_file.truncate()
+                        state_file.write(f"{new_state[0]} {new_state[1]}")
+                        state_file.flush()
+
+                    return self.update_state(state, timeout, store)
+                finally:
+                    fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def update_state(self, state, timeout, store):
+        tokens, updated = state
+        now = time.time()
+        tokens = min(float(self.capacity), tokens + (now - updated) * self.rate) - 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        if timeout is not None and wait > timeout:
+            # Leave the bucket untouched so the queue is not held up
+            raise RateLimitTimeout(f"{self.name} rate limit would delay this call by {wait:.1f} seconds")
+        store((tokens, now))
+        self.backlog = max(0.0, -tokens)
+        return wait
+
+    def store_local_state(self, state):
+        self.local_state = state
+
+    def acquire(self, timeout=None):
+        # Blocks until this caller's token is due; returns the time waited
+        try:
+            wait = self.reserve(timeout)
+        except RateLimitTimeout:
+            with self.lock:
+                self.timeouts += 1
+            raise
+
+        with self.lock:
+            self.waiting += 1
+        try:
+            if wait > 0:
+                time.sleep(wait)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+                self.acquired += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rate_per_second': self.rate,
+                'capacity': self.capacity,
+                'shared': self.path is not None,
+                'queue_depth': self.waiting,
+                'queued_across_workers': round(self.backlog, 2),
+                'acquired': self.acquired,
+                'timeouts': self.timeouts,
+                'average_wait': round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                'max_wait': round(self.max_wait, 3),
+            }
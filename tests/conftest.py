@@ -0,0 +1,25 @@
+import os, sys
+
+# The modules live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    # app.py needs the full requirements.txt (pytrends, googlesearcher, ...)
+    pytest.importorskip('pytrends')
+    pytest.importorskip('googlesearcher')
+    state_dir = tmp_path_factory.mktemp('app')
+    os.environ.setdefault('RATE_LIMIT_DIR', str(state_dir / 'rate-limits'))
+    os.environ.setdefault('JOB_QUEUE_PATH', str(state_dir / 'jobs.sqlite3'))
+    os.environ.setdefault('KEYWORD_CORPUS_ENABLED', '0')
+    os.environ.setdefault('KEYWORD_NEIGHBORS_ENABLED', '0')
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
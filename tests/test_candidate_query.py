@@ -0,0 +1,26 @@
+class FakeCursor:
+    def __init__(self, index_exists):
+        self.index_exists = index_exists
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchone(self):
+        return (self.index_exists,)
+
+
+def test_without_trigram_index_samples_the_window(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'indexes_checked', {})
+    query, params = app_module.candidate_query(FakeCursor(False), 'googlekeywords_data_us', 'running shoes')
+    # The exact match, then a random sample that changes on every call
+    assert 'lower(trim("Keyword")) = %s' in query
+    assert 'ORDER BY RANDOM() LIMIT %s' in query
+    assert params == ('running shoes', 8, 20, 'running shoes', app_module.num_rows)
+
+
+def test_with_trigram_index_orders_by_similarity(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'indexes_checked', {})
+    query, params = app_module.candidate_query(FakeCursor(True), 'googlekeywords_data_us', 'running shoes')
+    assert 'ORDER BY similarity' in query
+    assert params[-1] == app_module.num_rows
@@ -0,0 +1,91 @@
+import os, socket, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+overview_sections = [
+    "Comprehensive Keyword Analysis", "Keyword Overview", "SERP Analysis",
+    "Your Targeted Keword Trending History On Google", "Interest Google Trends Data",
+    "Google Trends Data", "Related Keywords",
+]
+
+
+@pytest.fixture(scope='module')
+def gevent_server(tmp_path_factory):
+    # The stubbed app (benchmarks/overview_stubs.py) under real gevent workers
+    for module in ('gevent', 'gunicorn', 'psycogreen', 'pytrends', 'googlesearcher'):
+        pytest.importorskip(module)
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    state_dir = tmp_path_factory.mktemp('gevent')
+    env = dict(
+        os.environ, STUB_DELAY='0.2', WEB_CONCURRENCY='1', TRENDS_CLIENTS_PER_GEO='20',
+        RATE_LIMIT_DIR=str(state_dir / 'rate-limits'), JOB_QUEUE_PATH=str(state_dir / 'jobs.sqlite3'),
+    )
+    env.pop('RAPIDAPI_BASE_URL', None)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_async.conf.py', '--chdir', 'benchmarks',
+         '--bind', f'127.0.0.1:{port}', 'overview_stubs:app'],
+        cwd=root, env=env
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f'{url}/cache_stats', timeout=1)
+                break
+            except requests.ConnectionError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    pytest.fail("gunicorn did not start")
+                time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def fetch_overview(url, keyword):
+    return requests.get(f'{url}/keyword_overview_Data', params={'keyword': keyword, 'country': 'us'}, timeout=60)
+
+
+def test_overview_json_shape(gevent_server):
+    response = fetch_overview(gevent_server, 'running shoes')
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [next(iter(item)) for item in body] == overview_sections
+    assert all(len(item) == 1 for item in body)
+    sections = {name: value for item in body for name, value in item.items()}
+
+    assert sections["Keyword Overview"]["Keyword"] == 'running shoes'
+    assert sections["Keyword Overview"]["Updated"]
+    related = sections["Related Keywords"]
+    assert related[0] == {"Total Related Keywords": len(related) - 1}
+    assert {"Keyword", "Avg. monthly searches", "Updated"} <= set(related[1])
+    assert len(sections["SERP Analysis"]["SERP Results (Top 100)"]) == 10
+    assert len(sections["Your Targeted Keword Trending History On Google"]) == 12
+    assert sections["Interest Google Trends Data"]["Interest Google Trends Data"][0] == {
+        "region": "United States", "interest": 100
+    }
+    queries = sections["Google Trends Data"][0]["related keywords shown on Google Trends"]["running shoes"]
+    assert queries["top"][0] == {"keyword idea": "running shoes 0", "search value": 100}
+
+
+def test_requests_overlap_on_one_worker(gevent_server):
+    # Each overview waits about 1 s on the stubs; one gevent worker answers
+    # twenty at once in far less than the 20 s a sync worker would need
+    keywords = [f'seo tool {chr(97 + n)}' for n in range(20)]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(keywords)) as executor:
+        responses = list(executor.map(lambda keyword: fetch_overview(gevent_server, keyword), keywords))
+    elapsed = time.monotonic() - started
+
+    assert [response.status_code for response in responses] == [200] * len(keywords)
+    assert all([next(iter(item)) for item in response.json()] == overview_sections for response in responses)
+    assert elapsed < 8
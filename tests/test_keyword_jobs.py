@@ -0,0 +1,58 @@
+import pytest
+
+from keyword_jobs import JobQueue
+
+
+def run_job(kind, params):
+    return {'kind': kind, 'params': params}, 200
+
+
+@pytest.fixture
+def queue(tmp_path):
+    # No worker threads: the tests run jobs with run_next()
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), run_job, workers=0, allowed_callback_hosts=['hooks.internal'])
+    queue.ensure_workers()
+    return queue
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/hook',
+    'http://localhost:8080/hook',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://10.0.0.5/hook',
+    'https://192.168.1.10/hook',
+    'http://172.16.0.1/hook',
+    'http://100.64.0.1/hook',
+    'http://0.0.0.0/hook',
+    'http://[::1]/hook',
+    'http://[::ffff:127.0.0.1]/hook',
+    'http://[fe80::1]/hook',
+    'http://224.0.0.1/hook',
+    'ftp://8.8.8.8/hook',
+    'file:///etc/passwd',
+    'http:///hook',
+])
+def test_rejects_non_public_callback_urls(queue, url):
+    with pytest.raises(ValueError):
+        queue.submit('keyword_overview', {}, url)
+
+
+def test_accepts_public_and_allowed_hosts(queue, monkeypatch):
+    queue.check_callback_url('https://8.8.8.8/hook')
+    # Allowed hosts skip the address check, without resolving them
+    monkeypatch.setattr('socket.getaddrinfo', lambda *args, **kwargs: pytest.fail("resolved an allowed host"))
+    queue.check_callback_url('http://hooks.internal:9000/hook')
+
+
+def test_delivery_rechecks_the_callback_url(queue, monkeypatch):
+    # The host resolved to a public address on submit, then to the metadata
+    # address by the time the job finished
+    answers = iter(['93.184.216.34', '169.254.169.254'])
+    monkeypatch.setattr('socket.getaddrinfo', lambda host, port, **kwargs: [(2, 1, 6, '', (next(answers), port))])
+    monkeypatch.setattr('requests.post', lambda *args, **kwargs: pytest.fail("posted to a non-public host"))
+
+    job_id = queue.submit('keyword_overview', {'keyword': 'shoes'}, 'http://rebind.example/hook')
+    assert queue.run_next()
+    job = queue.get(job_id)
+    assert job['status'] == 'done'
+    assert job['callback_status'] == 'rejected (host is not public)'
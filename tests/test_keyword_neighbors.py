@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+import keyword_neighbors
+from keyword_similarity import score_related_rows
+
+
+def brute_force(keywords):
+    return {
+        (seed, row[0], score)
+        for seed in keywords
+        for row, score in score_related_rows(seed, [(candidate,) for candidate in keywords])
+    }
+
+
+def build(raw_keywords, monkeypatch, count_columns=63):
+    monkeypatch.setattr(keyword_neighbors, 'count_columns', count_columns)
+    ordered, offsets = keyword_neighbors.index_keywords(raw_keywords)
+    counts, lengths = keyword_neighbors.count_characters(ordered)
+    monkeypatch.setattr(keyword_neighbors, 'keywords', ordered)
+    monkeypatch.setattr(keyword_neighbors, 'length_offsets', offsets)
+    monkeypatch.setattr(keyword_neighbors, 'char_counts', counts)
+    monkeypatch.setattr(keyword_neighbors, 'keyword_lengths', lengths)
+    return ordered
+
+
+def corpus(size, seed=7):
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz   éü-'
+    stems = [''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 20))) for _ in range(size // 4)]
+    keywords = []
+    for _ in range(size):
+        keyword = list(rng.choice(stems))
+        for _ in range(rng.randint(0, 3)):
+            keyword.insert(rng.randint(0, len(keyword)), rng.choice(alphabet))
+        keywords.append(''.join(keyword))
+    return keywords
+
+
+@pytest.mark.parametrize('count_columns', [63, 4])
+def test_matches_brute_force(monkeypatch, count_columns):
+    # With 4 columns most characters share the overflow column, which only
+    # loosens the bound
+    ordered = build(corpus(600), monkeypatch, count_columns)
+    found = set(keyword_neighbors.neighbors_of((0, len(ordered))))
+    assert found == brute_force(ordered)
+    assert len(found) > len(ordered)
+
+
+def test_chunks_cover_every_seed(monkeypatch):
+    ordered = build(corpus(300, seed=3), monkeypatch)
+    chunks = [(start, min(start + 64, len(ordered))) for start in range(0, len(ordered), 64)]
+    found = set()
+    for chunk in chunks:
+        found.update(keyword_neighbors.neighbors_of(chunk))
+    assert found == brute_force(ordered)
+
+
+def test_long_keywords_use_wider_counts(monkeypatch):
+    long_keyword = 'a' * 300
+    build([long_keyword, long_keyword[:-1], 'short'], monkeypatch)
+    assert keyword_neighbors.char_counts.dtype == 'uint16'
+    assert keyword_neighbors.char_counts.max() == 300
+    # Only the bound is checked here; difflib's autojunk decides the score
+    assert keyword_neighbors.keyword_lengths.tolist() == [5, 299, 300]
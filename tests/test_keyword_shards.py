@@ -0,0 +1,64 @@
+import os
+from multiprocessing import shared_memory
+
+import pytest
+
+import keyword_shards
+from keyword_corpus import KeywordCorpus
+from keyword_shards import SharedKeywords, ShardedScorer
+from keyword_store import KeywordStore
+
+rows = [(keyword, '1000', '50', '0.50', '2.00') + ('0',) * 12 for keyword in ('shoes', 'running shoes', 'shoe')]
+
+
+def block_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+@pytest.fixture
+def shared():
+    shared = SharedKeywords(KeywordStore.from_rows(rows))
+    yield shared
+    shared.release()
+
+
+def test_release_unlinks_the_block(shared):
+    assert keyword_shards.published[shared.name] is shared
+    shared.release()
+    assert not block_exists(shared.name)
+    assert shared.name not in keyword_shards.published
+    shared.release()
+
+
+def test_release_tolerates_a_block_already_unlinked(shared):
+    # What a second worker sees after another one replaced a preloaded block
+    shared_memory.SharedMemory(name=shared.name).unlink()
+    shared.release()
+    assert shared.block is None
+
+
+def test_exit_only_unlinks_blocks_this_process_created(shared):
+    inherited = SharedKeywords(KeywordStore.from_rows(rows))
+    inherited.owner_pid = os.getppid()
+    try:
+        keyword_shards.release_published()
+        assert not block_exists(shared.name)
+        assert block_exists(inherited.name)
+    finally:
+        inherited.release()
+
+
+def test_replacing_a_snapshot_unlinks_its_block():
+    versions = iter([1, 2])
+    corpus = KeywordCorpus(lambda country: rows, lambda country: next(versions), scorer=ShardedScorer(2))
+    first = corpus.load('us')
+    second = corpus.load('us')
+    try:
+        assert not block_exists(first.shared.name)
+        assert block_exists(second.shared.name)
+    finally:
+        second.release()
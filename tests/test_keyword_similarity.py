@@ -0,0 +1,61 @@
+import difflib, random, re
+
+from keyword_similarity import KeywordScorer, similarity_threshold, trigram_candidate_threshold
+
+
+def trigrams(text):
+    # The trigram set pg_trgm builds: lowercased alphanumeric words, each
+    # padded with two spaces in front and one behind
+    result = set()
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def trigram_similarity(a, b):
+    a, b = trigrams(a), trigrams(b)
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+def qualifying_pairs(count, seed=1):
+    # Random keywords with one to three edits whose difflib ratio still
+    # reaches similarity_threshold
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    pairs = []
+    while len(pairs) < count:
+        keyword = ''.join(rng.choice(letters) for _ in range(rng.randint(5, 25)))
+        edited = list(keyword)
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(edited) + 1)
+            operation = rng.random()
+            if operation < 0.4 and position < len(edited):
+                edited[position] = rng.choice(letters + ' ')
+            elif operation < 0.7:
+                edited.insert(position, rng.choice(letters + ' '))
+            elif position < len(edited):
+                del edited[position]
+        edited = ''.join(edited).strip()
+        if edited and difflib.SequenceMatcher(None, keyword, edited).ratio() >= similarity_threshold:
+            pairs.append((keyword, edited))
+    return pairs
+
+
+def test_trigram_prefilter_can_drop_a_qualifying_pair():
+    assert difflib.SequenceMatcher(None, 'abcdefghij', 'abxdefyhij').ratio() >= similarity_threshold
+    assert trigram_similarity('abcdefghij', 'abxdefyhij') <= trigram_candidate_threshold
+
+
+def test_trigram_prefilter_loss_stays_small():
+    pairs = qualifying_pairs(5000)
+    dropped = sum(1 for a, b in pairs if trigram_similarity(a, b) <= trigram_candidate_threshold)
+    assert dropped / len(pairs) < 0.05
+
+
+def test_scorer_matches_difflib():
+    scorer = KeywordScorer('running shoes')
+    for candidate in ['running shoe', 'running shoes', 'runing shoes', 'running', 'shoes running', 'walking boots']:
+        ratio = difflib.SequenceMatcher(None, 'running shoes', candidate).ratio()
+        expected = ratio if ratio >= similarity_threshold else None
+        assert scorer.score(candidate) == expected
@@ -0,0 +1,42 @@
+from keyword_corpus_file import open_corpus_file, write_corpus_file
+from keyword_store import KeywordStore
+
+monthly = ('10',) * 12
+
+
+def test_fixed_precision_bids_round_trip_without_overflow():
+    rows = [
+        ('running shoes', '1000', '50', '2.00', '1.50') + monthly,
+        ('trail shoes', '90', '20', '0.10', '12.25') + monthly,
+        ('shoes', '5', '3', '3.00', '4.00') + monthly,
+    ]
+    store = KeywordStore.from_rows(rows)
+    assert store.decimals == {3: 2, 4: 2}
+    assert store.overflow == {}
+    assert [store.row(row_id) for row_id in range(len(rows))] == rows
+
+
+def test_other_precisions_and_missing_bids_still_round_trip():
+    rows = [
+        ('running shoes', '1000', '50', '2.00', '1.50') + monthly,
+        ('trail shoes', '90', '20', '2.5', '') + monthly,
+        ('shoes', '5', '3', None, '1,204.10') + monthly,
+    ]
+    store = KeywordStore.from_rows(rows)
+    assert sorted(store.overflow) == [1, 2]
+    assert [store.row(row_id) for row_id in range(len(rows))] == rows
+
+
+def test_typed_bids_stay_numbers():
+    rows = [('running shoes', 1000, 50, 2.0, 1.5) + (10,) * 12]
+    store = KeywordStore.from_rows(rows)
+    assert store.decimals == {}
+    assert store.row(0) == rows[0]
+
+
+def test_corpus_file_keeps_the_precision(tmp_path):
+    rows = [('running shoes', '1000', '50', '2.00', '1.50') + monthly]
+    path = tmp_path / 'us.corpus'
+    write_corpus_file(str(path), KeywordStore.from_rows(rows), [1, 1, 0, 0])
+    store, _ = open_corpus_file(str(path))
+    assert store.row(0) == rows[0]
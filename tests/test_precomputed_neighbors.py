@@ -0,0 +1,67 @@
+import contextlib, types
+
+import pytest
+
+row = ('running shoes', 1000, 50, 0.5, 2.0) + (1000,) * 12
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchone(self):
+        return (True,)
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def neighbors_app(app_module, monkeypatch):
+    scored = []
+    snapshot = types.SimpleNamespace(related_rows=lambda keyword, ranking=None: scored.append(keyword) or [(row, 0.9)])
+    monkeypatch.setattr(app_module, 'keyword_neighbors_enabled', True)
+    monkeypatch.setattr(app_module, 'keyword_corpus_enabled', True)
+    monkeypatch.setattr(app_module, 'keyword_corpus', types.SimpleNamespace(get=lambda country: snapshot))
+    monkeypatch.setattr(app_module, 'fetch_precomputed_neighbors_batch', lambda keywords, country: {
+        keyword: [(row, 1.0)] for keyword in keywords if keyword == 'running shoes'
+    })
+    app_module.scored = scored
+    return app_module
+
+
+def test_neighbor_list_is_read_before_the_corpus(neighbors_app):
+    assert neighbors_app.fetch_keyword_rows('running shoes', 'us') == [(row, 1.0)]
+    assert neighbors_app.scored == []
+
+
+def test_corpus_scores_keywords_missing_from_the_lists(neighbors_app):
+    assert neighbors_app.fetch_keyword_rows('trail shoes', 'us') == [(row, 0.9)]
+    assert neighbors_app.scored == ['trail shoes']
+
+
+def test_batch_reads_lists_and_scores_the_rest(neighbors_app):
+    related = neighbors_app.fetch_related_rows_batch(['running shoes', 'trail shoes'], 'us')
+    assert related == {'running shoes': [(row, 1.0)], 'trail shoes': [(row, 0.9)]}
+    assert neighbors_app.scored == ['trail shoes']
+
+
+def test_batch_query_groups_rows_by_seed(app_module, monkeypatch):
+    cursor = FakeCursor([
+        ('running shoes',) + row + (1.0,),
+        ('running shoes',) + ('running shoe',) + row[1:] + (0.96,),
+        ('trail shoes',) + ('trail shoes',) + row[1:] + (1.0,),
+    ])
+    monkeypatch.setattr(app_module, 'postgres_cursor', lambda: contextlib.nullcontext(cursor))
+    monkeypatch.setattr(app_module, 'indexes_checked', {})
+    neighbors = app_module.fetch_precomputed_neighbors_batch(['running shoes', 'trail shoes', 'socks'], 'us')
+    assert [score for _, score in neighbors['running shoes']] == [1.0, 0.96]
+    assert neighbors['trail shoes'][0][0][0] == 'trail shoes'
+    assert 'socks' not in neighbors
+    # One query for every seed
+    assert cursor.executed[-1][1] == (['running shoes', 'trail shoes', 'socks'],)
+    assert sum('googlekeywords_neighbors_us' in query for query, _ in cursor.executed) == 1
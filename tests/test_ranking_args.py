@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.mark.parametrize('value', [[1], {'value': 1}, True, 'nan', 'inf', '-inf', 'many'])
+def test_batch_rejects_bad_ranking_values(client, value):
+    response = client.post('/keyword_ideas/batch', json={'keywords': ['shoes'], 'country': 'us', 'min_volume': value})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid min_volume parameter.'}
+
+
+@pytest.mark.parametrize('body', [{'sort': ['volume']}, {'sort': {'volume': 1}}, {'order': ['asc']}, {'limit': [5]}])
+def test_batch_rejects_bad_sort_order_and_limit(client, body):
+    body.update(keywords=['shoes'], country='us')
+    response = client.post('/keyword_ideas/batch', json=body)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', 'abc'])
+def test_keyword_ideas_rejects_non_finite_values(client, value):
+    response = client.get('/keyword_ideas', query_string={'keyword': 'shoes', 'country': 'us', 'min_volume': value})
+    assert response.status_code == 400
+
+
+def test_parse_ranking_args_accepts_numbers(app_module):
+    ranking = app_module.parse_ranking_args({'min_volume': 10, 'max_high_bid': '2.5', 'sort': 'volume', 'order': 'asc', 'limit': '5'})
+    assert ranking == {'min_volume': 10.0, 'max_high_bid': 2.5, 'sort_by': 'volume', 'descending': False, 'limit': 5}
+
+
+@pytest.mark.parametrize('body', [['shoes'], 'shoes', 5, True])
+def test_batch_rejects_bodies_that_are_not_objects(client, body):
+    response = client.post('/keyword_ideas/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Send a JSON body with a 'keywords' list and a 'country'."}
@@ -0,0 +1,160 @@
+import json, threading, time, types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import rapidapi_client
+from rapidapi_client import CircuitBreaker, CircuitOpenError, RapidAPIClient
+
+trend_history = [{'Month_Date_Year': '01-01-2023', 'Search_Count': 100}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Answers with the next (status, delay) of server.script, then 200s
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        self.server.api_keys.append(self.headers.get('X-RapidAPI-Key'))
+        status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        time.sleep(delay)
+        body = json.dumps(trend_history if status == 200 else {'message': 'error'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.script = []
+    server.hits = []
+    server.api_keys = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Records the backoff delays instead of waiting them out
+    delays = []
+    monkeypatch.setattr(rapidapi_client, 'time', types.SimpleNamespace(time=time.time, sleep=delays.append))
+    return delays
+
+
+def make_client(server, **options):
+    options.setdefault('backoff', 0.1)
+    return RapidAPIClient(f'http://127.0.0.1:{server.server_port}', 'key', 'host', **options)
+
+
+def test_returns_json_and_sends_headers(stub):
+    client = make_client(stub)
+    assert client.get_json('running shoes') == trend_history
+    assert stub.hits == ['/running%20shoes']
+    assert stub.api_keys == ['key']
+
+
+def test_read_timeout(stub):
+    stub.script = [(200, 1.0)]
+    client = make_client(stub, read_timeout=0.2, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get_json('shoes')
+    assert time.monotonic() - started < 0.9
+    assert client.breaker.failures == 1
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_retries_transient_statuses_with_backoff(stub, sleeps, status):
+    stub.script = [(status, 0), (status, 0)]
+    client = make_client(stub, max_retries=2)
+    assert client.get_json('shoes') == trend_history
+    assert len(stub.hits) == 3
+    # Jittered exponential backoff: base * 2**attempt * [0.5, 1.5]
+    assert len(sleeps) == 2
+    for attempt, delay in enumerate(sleeps):
+        assert 0.05 * 2 ** attempt <= delay <= 0.15 * 2 ** attempt
+    assert client.breaker.state == 'closed'
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.script = [(503, 0)] * 3
+    client = make_client(stub, max_retries=2)
+    with pytest.raises(rapidapi_client.RetryableStatus):
+        client.get_json('shoes')
+    assert len(stub.hits) == 3
+    assert client.breaker.failures == 1
+
+
+@pytest.mark.parametrize('status', [400, 401, 403, 404])
+def test_does_not_retry_other_client_errors(stub, sleeps, status):
+    stub.script = [(status, 0)]
+    client = make_client(stub, max_retries=2)
+    with pytest.raises(requests.HTTPError):
+        client.get_json('shoes')
+    assert len(stub.hits) == 1
+    assert sleeps == []
+    assert client.breaker.state == 'closed'
+
+
+def test_breaker_opens_after_threshold(stub):
+    stub.script = [(500, 0)] * 3
+    client = make_client(stub, max_retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    for _ in range(3):
+        with pytest.raises(rapidapi_client.RetryableStatus):
+            client.get_json('shoes')
+    assert client.breaker.state == 'open'
+
+    # Fails fast without calling the stub
+    with pytest.raises(CircuitOpenError):
+        client.get_json('shoes')
+    assert len(stub.hits) == 3
+
+
+def test_half_open_probe_closes_the_breaker(stub):
+    stub.script = [(500, 0)] * 2
+    client = make_client(stub, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    for _ in range(2):
+        with pytest.raises(rapidapi_client.RetryableStatus):
+            client.get_json('shoes')
+    with pytest.raises(CircuitOpenError):
+        client.get_json('shoes')
+
+    time.sleep(0.25)
+    assert client.get_json('shoes') == trend_history
+    assert client.breaker.state == 'closed'
+    assert len(stub.hits) == 3
+
+
+def test_failed_probe_opens_the_breaker_again(stub):
+    stub.script = [(500, 0)] * 3
+    client = make_client(stub, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    for _ in range(2):
+        with pytest.raises(rapidapi_client.RetryableStatus):
+            client.get_json('shoes')
+
+    time.sleep(0.25)
+    with pytest.raises(rapidapi_client.RetryableStatus):
+        client.get_json('shoes')
+    assert client.breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.get_json('shoes')
+    assert len(stub.hits) == 3
+
+
+def test_read_timeout_ignores_changed_default_retries(stub, monkeypatch):
+    # app.py sets requests.adapters.DEFAULT_RETRIES = 10 at import time
+    monkeypatch.setattr(requests.adapters, 'DEFAULT_RETRIES', 10)
+    stub.script = [(200, 1.0)]
+    client = make_client(stub, read_timeout=0.2, max_retries=0)
+    with pytest.raises(requests.Timeout):
+        client.get_json('shoes')
+    assert len(stub.hits) == 1
@@ -0,0 +1,56 @@
+import types
+
+import pytest
+
+
+class FakeTrendReq:
+    def __init__(self):
+        self.calls = []
+
+    def build_payload(self, kw_list):
+        self.calls.append(('build_payload', list(kw_list)))
+        self.kw_list = kw_list
+
+    def related_queries(self):
+        self.calls.append(('related_queries',))
+        return {keyword: {'top': None, 'rising': None} for keyword in self.kw_list}
+
+    def interest_by_region(self, resolution='COUNTRY', inc_geo_code=False):
+        self.calls.append(('interest_by_region', list(self.kw_list)))
+        return {keyword: {'United States': 100, 'Canada': 40} for keyword in self.kw_list}
+
+
+@pytest.fixture
+def trends(app_module, monkeypatch):
+    client = FakeTrendReq()
+    acquired = []
+    monkeypatch.setattr(app_module, 'trends_clients', types.SimpleNamespace(run=lambda geo, work: work(client)))
+    monkeypatch.setitem(app_module.rate_limiters, 'trends', types.SimpleNamespace(
+        acquire=lambda timeout=None: acquired.append(timeout)
+    ))
+    client.acquired = acquired
+    return client
+
+
+def test_single_keyword_shares_one_payload(app_module, trends):
+    bundles = app_module.request_trends_batch('US', ['solo shoes'])
+    assert trends.calls == [('build_payload', ['solo shoes']), ('related_queries',), ('interest_by_region', ['solo shoes'])]
+    assert len(trends.acquired) == 2
+    assert bundles['solo shoes']['interest'] == {'Interest Google Trends Data': [
+        {'region': 'United States', 'interest': 100}, {'region': 'Canada', 'interest': 40},
+    ]}
+
+
+def test_batch_returns_related_queries_without_waiting_for_interest(app_module, trends):
+    keywords = ['batch shoes', 'batch boots', 'batch socks']
+    bundles = app_module.request_trends_batch('US', keywords)
+    assert trends.calls == [('build_payload', keywords), ('related_queries',)]
+    assert len(trends.acquired) == 1
+    assert all('interest' not in bundles[keyword] for keyword in keywords)
+
+
+def test_interest_of_a_batched_keyword_uses_its_own_payload(app_module, trends, monkeypatch):
+    monkeypatch.setattr(app_module, 'fetch_trends_bundle', lambda keyword, country_code: {'trends': {}})
+    interest = app_module.fetch_interest_bundle('batch shoes', 'us')
+    assert trends.calls == [('build_payload', ['batch shoes']), ('interest_by_region', ['batch shoes'])]
+    assert interest['Interest Google Trends Data'][0] == {'region': 'United States', 'interest': 100}
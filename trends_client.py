@@ -0,0 +1,160 @@
+import os, queue, threading
+from concurrent.futures import Future
+
+
+def is_expired_session_error(error):
+    # pytrends raises TooManyRequestsError for 429s and ResponseError for
+    # other bad statuses; both carry the response
+    response = getattr(error, 'response', None)
+    return type(error).__name__ == 'TooManyRequestsError' or getattr(response, 'status_code', None) in (401, 429)
+
+
+class TrendsClientPool:
+    """Warm, reusable pytrends clients keyed by geo.
+
+    Creating a ``TrendReq`` performs the cookie handshake with Google Trends,
+    so clients are created once and lent out to one thread at a time (a
+    client keeps per-payload state and is not safe to share). When Google
+    answers 429 or rejects the session, the client's cookies are refreshed
+    and the work is retried once.
+    """
+
+    def __init__(self, factory, size_per_geo=2):
+        self.factory = factory
+        self.size_per_geo = size_per_geo
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Clients created before a fork share sockets with the parent
+        self.pid = os.getpid()
+        self.idle = {}
+        self.created = {}
+
+    def borrow(self, geo):
+        while True:
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.reset()
+                idle = self.idle.setdefault(geo, queue.LifoQueue())
+                create = idle.empty() and self.created.get(geo, 0) < self.size_per_geo
+                if create:
+                    self.created[geo] = self.created.get(geo, 0) + 1
+
+            if create:
+                try:
+                    return self.factory(geo)
+                except Exception:
+                    with self.lock:
+                        self.created[geo] -= 1
+                    raise
+
+            # Re-check now and then in case a broken client was discarded
+            try:
+                return idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def give_back(self, geo, client):
+        with self.lock:
+            if self.pid != os.getpid():
+                return
+            idle = self.idle[geo]
+        idle.put(client)
+
+    def discard(self, geo):
+        with self.lock:
+            if self.pid == os.getpid():
+                self.created[geo] -= 1
+
+    def run(self, geo, work):
+        # Calls work(client) with a pooled client for `geo`
+        client = self.borrow(geo)
+        healthy = True
+        try:
+            try:
+                return work(client)
+            except Exception as e:
+                if not is_expired_session_error(e):
+                    raise
+                print(f"Refreshing Google Trends session for {geo}: {str(e)}")
+                healthy = False
+                client.cookies = client.GetGoogleCookie()
+                healthy = True
+                return work(client)
+        finally:
+            if healthy:
+                self.give_back(geo, client)
+            else:
+                # The cookie refresh failed; a fresh client is built next time
+                self.discard(geo)
+
+
+class TrendsBatcher:
+    """Groups Trends lookups for the same geo into requests of up to five keywords.
+
+    pytrends accepts up to five keywords per payload. The first lookup for
+    a geo opens a batch that stays open for ``window`` seconds (or until it
+    is full); ``fetch_batch(geo, keywords)`` is then called once and must
+    return a dict mapping each keyword to its result, which is handed back
+    to every caller waiting on that keyword.
+    """
+
+    def __init__(self, fetch_batch, window=0.1, max_batch=5):
+        self.fetch_batch = fetch_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.batches = 0
+        self.keywords = 0
+
+    def submit(self, geo, keyword):
+        # Blocks until the batch holding `keyword` has been fetched
+        full = None
+        with self.lock:
+            batch = self.pending.get(geo)
+            if batch is None:
+                batch = self.pending[geo] = {}
+                timer = threading.Timer(self.window, self.flush, args=(geo, batch))
+                timer.daemon = True
+                timer.start()
+            future = batch.get(keyword)
+            if future is None:
+                future = batch[keyword] = Future()
+            if len(batch) >= self.max_batch:
+                full = batch
+
+        if full is not None:
+            self.flush(geo, full)
+        return future.result()
+
+    def flush(self, geo, batch):
+        with self.lock:
+            # The batch may already have been sent because it filled up
+            if self.pending.get(geo) is not batch:
+                return
+            del self.pending[geo]
+            self.batches += 1
+            self.keywords += len(batch)
+
+        try:
+            results = self.fetch_batch(geo, list(batch))
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+
+        for keyword, future in batch.items():
+            if keyword in results:
+                future.set_result(results[keyword])
+            else:
+                future.set_exception(KeyError(f"No Google Trends data returned for '{keyword}'"))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'batches': self.batches,
+                'keywords': self.keywords,
+                'average_batch_size': round(self.keywords / self.batches, 2) if self.batches else 0.0,
+            }